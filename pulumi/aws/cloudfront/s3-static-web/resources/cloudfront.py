@@ -95,7 +95,7 @@ def create_distribution(
                 ),
             ),
         )
-        cache_policy_id = custom_cache_policy.id,
+        cache_policy_id = custom_cache_policy.id
         origin_request_policy_id = origin_request_policies["AllViewer"]
         target_origin_id = "NLBOrigin"
 
@@ -0,0 +1,59 @@
+import math
+
+"""
+ArgoCD controller sharding and repo-server sizing from the expected number of applications and clusters
+"""
+
+# Applications reconciled per controller shard before splitting
+APPLICATIONS_PER_SHARD = 500
+# Applications served per repo-server replica
+APPLICATIONS_PER_REPO_SERVER = 500
+
+def size(applications: int, clusters: int = 1, controller_replicas: int = 1)->dict:
+  # Shards split the managed clusters between controller replicas, a cluster is never split
+  shards = max(1, min(clusters, math.ceil(applications / APPLICATIONS_PER_SHARD)))
+  applications_per_shard = math.ceil(applications / shards)
+
+  # Upstream guidance: 50 status and 25 operation processors per 1000 applications
+  status_processors = max(20, math.ceil(applications_per_shard * 50 / 1000))
+  operation_processors = max(10, math.ceil(status_processors / 2))
+
+  repo_server_replicas = max(2, math.ceil(applications / APPLICATIONS_PER_REPO_SERVER))
+
+  return {
+    "controller_shards": shards,
+    # Configured replicas ( `argocd:application_controller_replicas` ) are never lowered, replicas beyond the shards hold no cluster
+    "controller_replicas": max(controller_replicas, shards),
+    "status_processors": status_processors,
+    "operation_processors": operation_processors,
+    "repo_server_replicas": repo_server_replicas,
+    # Manifest generations requested by the status processors of every shard, spread over the repo-server replicas
+    "repo_server_parallelism_limit": max(5, math.ceil(shards * status_processors / repo_server_replicas)),
+    "repo_cache_expiration": "24h",
+    "reconciliation_timeout": "180s" if applications < 1000 else "300s",
+  }
+
+def release_values(sizing: dict)->dict:
+  return {
+    "controller": {
+      "replicas": sizing["controller_replicas"],
+    },
+    "repoServer": {
+      "replicas": sizing["repo_server_replicas"],
+      "extraArgs": [
+        f"--repo-cache-expiration={sizing['repo_cache_expiration']}",
+      ],
+    },
+    "configs": {
+      "params": {
+        "controller.status.processors": sizing["status_processors"],
+        "controller.operation.processors": sizing["operation_processors"],
+        "controller.repo.server.timeout.seconds": 180,
+        "controller.sharding.algorithm": "round-robin",
+        "reposerver.parallelism.limit": sizing["repo_server_parallelism_limit"],
+      },
+      "cm": {
+        "timeout.reconciliation": sizing["reconciliation_timeout"],
+      },
+    },
+  }
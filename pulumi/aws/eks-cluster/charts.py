@@ -0,0 +1,140 @@
+from pulumi_kubernetes import Provider
+from pulumi_kubernetes.helm.v3 import Release, ReleaseArgs, RepositoryOptsArgs
+import pulumi
+
+"""
+Helm releases not provided by `python_pulumi_helm.releases`
+"""
+
+def keda(provider: Provider, namespace: str = "keda", version: str = "2.11.2", depends_on: list = [])->Release:
+
+  release = Release(
+    "keda",
+    ReleaseArgs(
+      name="keda",
+      chart="keda",
+      version=version,
+      namespace=namespace,
+      create_namespace=True,
+      repository_opts=RepositoryOptsArgs(
+        repo="https://kedacore.github.io/charts",
+      ),
+      values={
+        "resources": {
+          "operator": {
+            "requests": { "cpu": "100m", "memory": "128Mi" },
+          },
+          "metricServer": {
+            "requests": { "cpu": "100m", "memory": "128Mi" },
+          },
+        },
+      },
+    ),
+    opts=pulumi.ResourceOptions(provider=provider, depends_on=depends_on),
+  )
+
+  return release
+
+def memcached(name: str, provider: Provider, namespace: pulumi.Input[str], replicas: int = 1, memory_mb: int = 1024, max_item_size: str = "1m", version: str = "6.6.2", depends_on: list = [])->Release:
+  """
+  Memcached cache tier, reachable through the `memcached_address` DNS SRV address
+  """
+  release = Release(
+    name,
+    ReleaseArgs(
+      name=name,
+      chart="memcached",
+      version=version,
+      namespace=namespace,
+      repository_opts=RepositoryOptsArgs(
+        repo="https://charts.bitnami.com/bitnami",
+      ),
+      values={
+        "fullnameOverride": name,
+        "architecture": "high-availability" if replicas > 1 else "standalone",
+        "replicaCount": replicas,
+        # Headless, so the SRV lookup of `memcached_address` returns every pod and the clients shard the keys across them
+        "service": {
+          "clusterIP": "None",
+        },
+        "extraEnvVars": [
+          { "name": "MEMCACHED_CACHE_SIZE", "value": str(memory_mb) },
+          { "name": "MEMCACHED_MAX_ITEM_SIZE", "value": max_item_size },
+        ],
+        # Headroom over the cache size for connections and slab overhead
+        "resources": {
+          "requests": { "cpu": "100m", "memory": f"{int(memory_mb * 1.2)}Mi" },
+          "limits": { "memory": f"{int(memory_mb * 1.2)}Mi" },
+        },
+      },
+    ),
+    opts=pulumi.ResourceOptions(provider=provider, depends_on=depends_on),
+  )
+
+  return release
+
+def memcached_address(name: str, namespace: str)->str:
+  return f"dnssrv+_memcache._tcp.{name}.{namespace}.svc.cluster.local"
+
+def local_static_provisioner(provider: Provider, values: dict, namespace: pulumi.Input[str], version: str = "2.0.0", depends_on: list = [])->Release:
+  """
+  Local volume provisioner, publishing the instance-store NVMe devices as PersistentVolumes
+  """
+  release = Release(
+    "local-static-provisioner",
+    ReleaseArgs(
+      name="local-static-provisioner",
+      chart="local-static-provisioner",
+      version=version,
+      namespace=namespace,
+      repository_opts=RepositoryOptsArgs(
+        repo="https://kubernetes-sigs.github.io/sig-storage-local-static-provisioner",
+      ),
+      values=values,
+    ),
+    opts=pulumi.ResourceOptions(provider=provider, depends_on=depends_on),
+  )
+
+  return release
+
+def node_local_dns(provider: Provider, values: dict, namespace: str = "kube-system", version: str = "2.0.3", depends_on: list = [])->Release:
+  """
+  NodeLocal DNSCache DaemonSet
+  """
+  release = Release(
+    "node-local-dns",
+    ReleaseArgs(
+      name="node-local-dns",
+      chart="node-local-dns",
+      version=version,
+      namespace=namespace,
+      repository_opts=RepositoryOptsArgs(
+        repo="https://charts.deliveryhero.io",
+      ),
+      values=values,
+    ),
+    opts=pulumi.ResourceOptions(provider=provider, depends_on=depends_on),
+  )
+
+  return release
+
+def cluster_proportional_autoscaler(name: str, provider: Provider, values: dict, namespace: str = "kube-system", version: str = "1.1.0", depends_on: list = [])->Release:
+  """
+  Replicas of a workload scaled from the number of nodes and cores
+  """
+  release = Release(
+    name,
+    ReleaseArgs(
+      name=name,
+      chart="cluster-proportional-autoscaler",
+      version=version,
+      namespace=namespace,
+      repository_opts=RepositoryOptsArgs(
+        repo="https://kubernetes-sigs.github.io/cluster-proportional-autoscaler",
+      ),
+      values=values,
+    ),
+    opts=pulumi.ResourceOptions(provider=provider, depends_on=depends_on),
+  )
+
+  return release
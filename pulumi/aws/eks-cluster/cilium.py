@@ -0,0 +1,75 @@
+import userdata
+
+"""
+Cilium eBPF datapath performance profile, mapped onto the cilium chart values
+"""
+
+# Nodes are tainted until the Cilium agent is ready, so pods are never started without the Cilium datapath
+AGENT_NOT_READY_TAINT = {
+  "key": "node.cilium.io/agent-not-ready",
+  "value": "true",
+  "effect": "NoExecute",
+}
+
+# Overridden from the `cilium:performance` config object
+performance_profile = {
+  # Services handled by Cilium instead of kube-proxy ( "strict" for Cilium < 1.14, "true" after )
+  "kube_proxy_replacement": "strict",
+  # Routing in eBPF, skipping the host iptables stack ( needs kube-proxy replacement and eBPF masquerading )
+  "bpf_host_routing": True,
+  # EDT-based pod egress rate limiting, from the `kubernetes.io/egress-bandwidth` annotation
+  "bandwidth_manager": True,
+  # BBR congestion control for pods, needs kernel >= 5.18 on the nodes
+  "bbr": False,
+  # NodePort and LoadBalancer services handled in XDP, needs a driver with native XDP support ( ENA )
+  "xdp_acceleration": False,
+  # Consistent hashing of service backends, keeps connections on the same backend when backends change
+  "maglev": True,
+  "maglev_table_size": 16381,
+  # Connection tracking table size, relative to the node memory
+  "bpf_map_dynamic_size_ratio": 0.005,
+}
+
+def get_profile(overrides: dict = {})->dict:
+  return userdata.deep_merge(performance_profile, overrides)
+
+def kube_proxy_replaced(profile: dict)->bool:
+  return str(profile["kube_proxy_replacement"]).lower() in ["strict", "true"]
+
+def performance_values(profile: dict, api_server_host: str = None)->dict:
+  """
+  Chart values for the profile, `api_server_host` is required without kube-proxy ( the `kubernetes` service is not reachable )
+  """
+  values = {
+    "kubeProxyReplacement": profile["kube_proxy_replacement"],
+    "bpf": {
+      "masquerade": profile["bpf_host_routing"],
+      "hostLegacyRouting": not profile["bpf_host_routing"],
+      "mapDynamicSizeRatio": profile["bpf_map_dynamic_size_ratio"],
+    },
+    "bandwidthManager": {
+      "enabled": profile["bandwidth_manager"],
+      "bbr": profile["bandwidth_manager"] and profile["bbr"],
+    },
+    "loadBalancer": {
+      "algorithm": "maglev" if profile["maglev"] else "random",
+      "acceleration": "native" if profile["xdp_acceleration"] else "disabled",
+    },
+  }
+
+  if profile["maglev"]:
+    values["maglev"] = { "tableSize": profile["maglev_table_size"] }
+
+  if kube_proxy_replaced(profile):
+    if not api_server_host:
+      raise ValueError("Cilium kube-proxy replacement needs the API server host")
+    values["k8sServiceHost"] = api_server_host
+    values["k8sServicePort"] = 443
+
+  return values
+
+def kube_proxy_node_selector()->dict:
+  """
+  kube-proxy DaemonSet node selector matching no node, so it stops running when Cilium replaces it
+  """
+  return { "io.cilium/no-schedule": "true" }
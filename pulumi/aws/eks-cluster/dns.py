@@ -0,0 +1,77 @@
+import ipaddress
+import userdata
+
+"""
+Cluster DNS: NodeLocal DNSCache on every node, kubelet `clusterDNS` pointing to it, and CoreDNS replicas scaled from the cluster size
+"""
+
+# Link-local address of the node cache, used by the kubelet as the pod nameserver
+LOCAL_DNS_IP = "169.254.20.25"
+
+# CoreDNS replicas ( cluster-proportional-autoscaler linear mode ), overridden from the `dns:coredns_autoscaling` config object
+coredns_autoscaling = {
+  "nodes_per_replica": 16,
+  "cores_per_replica": 256,
+  "min_replicas": 2,
+  "max_replicas": 20,
+}
+
+def kube_dns_ip(service_cidr: str)->str:
+  """
+  The `kube-dns` service IP, the tenth address of the service CIDR on EKS
+  """
+  return str(ipaddress.ip_network(service_cidr)[10])
+
+def bottlerocket_settings(enabled: bool)->dict:
+  """
+  Bottlerocket settings of the default node group and the Karpenter node templates
+  """
+  if not enabled:
+    return {}
+  return { "settings": { "kubernetes": { "cluster-dns-ip": LOCAL_DNS_IP } } }
+
+def kubelet_configuration(enabled: bool)->dict:
+  """
+  Karpenter provisioners kubelet configuration, passed to the bootstrap of the AL2 and Bottlerocket nodes
+  """
+  if not enabled:
+    return {}
+  return { "clusterDNS": [LOCAL_DNS_IP] }
+
+def node_local_dns_values(kube_dns_ip: str)->dict:
+  return {
+    "config": {
+      "localDns": LOCAL_DNS_IP,
+      "dnsServer": kube_dns_ip,
+      "dnsDomain": "cluster.local",
+      # Link-local interface and NOTRACK rules, so cached lookups skip conntrack
+      "setupInterface": True,
+      "setupIptables": True,
+    },
+    # On every node, including the tainted ones
+    "priorityClassName": "system-node-critical",
+    "tolerations": [ { "operator": "Exists" } ],
+    "resources": {
+      "requests": { "cpu": "25m", "memory": "32Mi" },
+      "limits": { "memory": "128Mi" },
+    },
+  }
+
+def coredns_autoscaler_values(overrides: dict = {})->dict:
+  profile = userdata.deep_merge(coredns_autoscaling, overrides)
+  return {
+    "config": {
+      "linear": {
+        "nodesPerReplica": profile["nodes_per_replica"],
+        "coresPerReplica": profile["cores_per_replica"],
+        "min": profile["min_replicas"],
+        "max": profile["max_replicas"],
+        "preventSinglePointFailure": True,
+        "includeUnschedulableNodes": True,
+      },
+    },
+    "options": {
+      "namespace": "kube-system",
+      "target": "deployment/coredns",
+    },
+  }
@@ -0,0 +1,118 @@
+"""
+Kubernetes exec credential plugin for EKS, with an on-disk token cache
+
+  python3 eks_token.py --cluster-name eks-main --region eu-central-1 [--role-arn arn:aws:iam::...]
+
+Generates the presigned STS GetCallerIdentity token ( same as `aws eks get-token` ) and caches it per
+cluster, region, role and AWS profile until shortly before it expires. Cache hits don't import botocore,
+so most kubectl and provider calls only pay for the Python interpreter startup.
+"""
+from os import path, environ
+import argparse
+import base64
+import datetime
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+CACHE_DIR = path.join(path.expanduser("~"), ".kube", "cache", "eks-token")
+# EKS accepts tokens for 15 minutes, `aws eks get-token` reports 14
+TOKEN_LIFETIME = datetime.timedelta(minutes=14)
+# Tokens closer than this to their expiration are renewed
+REFRESH_MARGIN = datetime.timedelta(minutes=1)
+TOKEN_PREFIX = "k8s-aws-v1."
+CLUSTER_HEADER = "x-k8s-aws-id"
+
+def _cache_file(cluster_name: str, region: str, role_arn: str = None)->str:
+  key = json.dumps([cluster_name, region, role_arn, environ.get("AWS_PROFILE")])
+  return path.join(CACHE_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest()[:16] + ".json")
+
+def _now()->datetime.datetime:
+  return datetime.datetime.now(datetime.timezone.utc)
+
+def _format_time(timestamp: datetime.datetime)->str:
+  return timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _parse_time(timestamp: str)->datetime.datetime:
+  return datetime.datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=datetime.timezone.utc)
+
+def exec_credential(token: str, expiration: datetime.datetime)->dict:
+  return {
+    "kind": "ExecCredential",
+    "apiVersion": "client.authentication.k8s.io/v1beta1",
+    "spec": {},
+    "status": {
+      "expirationTimestamp": _format_time(expiration),
+      "token": token,
+    },
+  }
+
+def read_cache(cache_file: str)->dict:
+  try:
+    with open(cache_file, "r") as f:
+      credential = json.load(f)
+    if _parse_time(credential["status"]["expirationTimestamp"]) - REFRESH_MARGIN > _now():
+      return credential
+  except (OSError, ValueError, KeyError):
+    pass
+  return None
+
+def write_cache(cache_file: str, credential: dict):
+  # Written to a temporary file and renamed, so concurrent calls never read a partial file
+  os.makedirs(path.dirname(cache_file), mode=0o700, exist_ok=True)
+  fd, tmp_file = tempfile.mkstemp(dir=path.dirname(cache_file))
+  with os.fdopen(fd, "w") as f:
+    json.dump(credential, f)
+  os.replace(tmp_file, cache_file)
+
+def generate_token(cluster_name: str, region: str, role_arn: str = None)->str:
+  import botocore.session
+
+  session = botocore.session.get_session()
+  credentials = None
+  if role_arn:
+    role = session.create_client("sts", region_name=region).assume_role(
+      RoleArn=role_arn,
+      RoleSessionName="eks-token",
+    )
+    credentials = role["Credentials"]
+
+  sts = session.create_client(
+    "sts",
+    region_name=region,
+    endpoint_url=f"https://sts.{region}.amazonaws.com",
+    aws_access_key_id=credentials["AccessKeyId"] if credentials else None,
+    aws_secret_access_key=credentials["SecretAccessKey"] if credentials else None,
+    aws_session_token=credentials["SessionToken"] if credentials else None,
+  )
+
+  def add_cluster_header(request, **kwargs):
+    request.headers[CLUSTER_HEADER] = cluster_name
+
+  sts.meta.events.register("before-sign.sts.GetCallerIdentity", add_cluster_header)
+  url = sts.generate_presigned_url("get_caller_identity", Params={}, ExpiresIn=60, HttpMethod="GET")
+
+  return TOKEN_PREFIX + base64.urlsafe_b64encode(url.encode("utf-8")).decode("utf-8").rstrip("=")
+
+def get_credential(cluster_name: str, region: str, role_arn: str = None, no_cache: bool = False)->dict:
+  cache_file = _cache_file(cluster_name, region, role_arn)
+  if not no_cache:
+    credential = read_cache(cache_file)
+    if credential:
+      return credential
+
+  credential = exec_credential(generate_token(cluster_name, region, role_arn), _now() + TOKEN_LIFETIME)
+  write_cache(cache_file, credential)
+  return credential
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="EKS exec credential plugin with token caching")
+  parser.add_argument("--cluster-name", required=True)
+  parser.add_argument("--region", required=True)
+  parser.add_argument("--role-arn", default=None, help="Role assumed to generate the token")
+  parser.add_argument("--no-cache", action="store_true", help="Always generate a new token")
+  args = parser.parse_args()
+
+  json.dump(get_credential(args.cluster_name, args.region, args.role_arn, args.no_cache), sys.stdout)
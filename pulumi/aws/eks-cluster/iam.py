@@ -64,95 +64,3 @@ def create_role_policy_attachment(name: str, role_name: str, policy_arn: str)->i
   )
   
   return attachment
-
-"""
-EKS cluster IAM role
-"""
-eks_cluster_role = iam.Role(
-  eks_name_prefix,
-  assume_role_policy="""{
-    "Version": "2012-10-17",
-    "Statement": [
-      {
-        "Action": "sts:AssumeRole",
-        "Principal": {
-          "Service": "eks.amazonaws.com"
-        },
-        "Effect": "Allow",
-        "Sid": ""
-      }
-    ]
-  }""",
-  tags={
-    "Name": eks_name_prefix,
-  },
-)
-
-iam.RolePolicyAttachment(
-  f"{eks_name_prefix}-AmazonEKSClusterPolicy",
-  policy_arn="arn:aws:iam::aws:policy/AmazonEKSClusterPolicy",
-  role=eks_cluster_role.name,
-)
-
-iam.RolePolicyAttachment(
-  f"{eks_name_prefix}-AmazonEKSServicePolicy",
-  policy_arn="arn:aws:iam::aws:policy/AmazonEKSServicePolicy",
-  role=eks_cluster_role.name,
-)
-
-"""
-Node IAM role
-"""
-ec2_role = iam.Role(
-  resource_name=f"{eks_name_prefix}-nodegroup",
-  assume_role_policy="""{
-    "Version": "2012-10-17",
-    "Statement": [
-      {
-        "Action": "sts:AssumeRole",
-        "Principal": {
-          "Service": "ec2.amazonaws.com"
-        },
-        "Effect": "Allow",
-        "Sid": ""
-      }
-    ]
-  }""",
-  tags={
-    "Name": f"{eks_name_prefix}-nodegroup",
-  },
-)
-
-ec2_role_instance_profile = iam.InstanceProfile(
-  f"{eks_name_prefix}-nodegroup",
-  role=ec2_role.name,
-)
-
-iam.RolePolicyAttachment(
-  f"{eks_name_prefix}-nodegroup-AmazonEKSWorkerNodePolicy",
-  policy_arn="arn:aws:iam::aws:policy/AmazonEKSWorkerNodePolicy",
-  role=ec2_role.name,
-)
-
-iam.RolePolicyAttachment(
-  f"{eks_name_prefix}-nodegroup-AmazonEKS_CNI_Policy",
-  policy_arn="arn:aws:iam::aws:policy/AmazonEKS_CNI_Policy",
-  role=ec2_role.name,
-)
-
-iam.RolePolicyAttachment(
-  f"{eks_name_prefix}-nodegroup-AmazonEC2ContainerRegistryReadOnly",
-  policy_arn="arn:aws:iam::aws:policy/AmazonEC2ContainerRegistryReadOnly",
-  role=ec2_role.name,
-)
-
-"""
-Controller IAM policies
-"""
-# https://raw.githubusercontent.com/kubernetes-sigs/aws-load-balancer-controller/v2.6.0/docs/install/iam_policy.json
-eks_policy_aws_load_balancer_controller = create_policy_from_file(f"{eks_name_prefix}-aws-load-balancer-controller", "iam/policies/aws-load-balancer-controller.json")
-# https://github.com/kubernetes-sigs/external-dns/blob/master/docs/tutorials/aws.md
-eks_policy_external_dns = create_policy_from_file(f"{eks_name_prefix}-external-dns", "iam/policies/external-dns.json")
-eks_policy_karpenter = create_policy_from_file(f"{eks_name_prefix}-karpenter", "iam/policies/karpenter.json")
-eks_policy_cluster_autoscaler = create_policy_from_file(f"{eks_name_prefix}-cluster-autoscaler", "iam/policies/cluster-autoscaler.json")
-eks_policy_ebs_csi_driver = create_policy_from_file(f"{eks_name_prefix}-ebs-csi-driver", "iam/policies/ebs-csi-driver.json")
@@ -0,0 +1,177 @@
+"""
+Build an EBS snapshot of a Bottlerocket data volume with pre-loaded container images
+
+  python image_cache.py --region eu-central-1 --subnet-id subnet-xxx --instance-profile eks-main-image-cache
+
+The snapshot is tagged with the hash of the image list, so the Pulumi program picks the snapshot
+matching the current `k8s/image-cache.yaml` and a new one has to be built when the list changes.
+"""
+from os import path
+import argparse
+import hashlib
+import json
+import time
+import yaml
+import boto3
+from pulumi_aws import ebs
+
+IMAGES_FILE = path.join(path.dirname(__file__), "k8s", "image-cache.yaml")
+HASH_TAG = "image-cache/hash"
+
+def load_images(images_file: str = IMAGES_FILE)->dict:
+  with open(images_file, "r") as f:
+    return yaml.safe_load(f.read())
+
+def images_hash(images_config: dict)->str:
+  content = json.dumps(
+    {
+      "arch": images_config["arch"],
+      "eks_version": str(images_config["eks_version"]),
+      "images": sorted(images_config["images"]),
+    },
+    sort_keys=True
+  )
+  return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+def snapshot_id(images_file: str = IMAGES_FILE)->str:
+  """
+  Get the most recent snapshot built from the current image list, if any
+  """
+  snapshots = ebs.get_snapshot_ids(
+    owners=["self"],
+    filters=[
+      ebs.GetSnapshotIdsFilterArgs(
+        name=f"tag:{HASH_TAG}",
+        values=[images_hash(load_images(images_file))],
+      ),
+      ebs.GetSnapshotIdsFilterArgs(
+        name="status",
+        values=["completed"],
+      ),
+    ],
+  )
+  return snapshots.ids[0] if snapshots.ids else None
+
+def _ssm_run(ssm_client, instance_id: str, commands: list, timeout: int = 1800):
+  command = ssm_client.send_command(
+    InstanceIds=[instance_id],
+    DocumentName="AWS-RunShellScript",
+    Parameters={ "commands": commands, "executionTimeout": [str(timeout)] },
+  )
+  command_id = command["Command"]["CommandId"]
+  while True:
+    time.sleep(10)
+    try:
+      invocation = ssm_client.get_command_invocation(CommandId=command_id, InstanceId=instance_id)
+    except ssm_client.exceptions.InvocationDoesNotExist:
+      continue
+    if invocation["Status"] in ["Pending", "InProgress", "Delayed"]:
+      continue
+    if invocation["Status"] != "Success":
+      raise RuntimeError(f"Command failed on {instance_id}: {invocation['StandardErrorContent']}")
+    return invocation["StandardOutputContent"]
+
+def build_snapshot(region: str, subnet_id: str, instance_profile: str, instance_type: str, volume_size: int, images_file: str = IMAGES_FILE, force: bool = False)->str:
+  images_config = load_images(images_file)
+  digest = images_hash(images_config)
+
+  ec2_client = boto3.client("ec2", region_name=region)
+  ssm_client = boto3.client("ssm", region_name=region)
+
+  if not force:
+    existing = ec2_client.describe_snapshots(
+      OwnerIds=["self"],
+      Filters=[{ "Name": f"tag:{HASH_TAG}", "Values": [digest] }, { "Name": "status", "Values": ["completed"] }],
+    )["Snapshots"]
+    if existing:
+      return sorted(existing, key=lambda s: s["StartTime"])[-1]["SnapshotId"]
+
+  ami_id = ssm_client.get_parameter(
+    Name=f"/aws/service/bottlerocket/aws-k8s-{images_config['eks_version']}/{images_config['arch']}/latest/image_id"
+  )["Parameter"]["Value"]
+
+  instance_id = ec2_client.run_instances(
+    ImageId=ami_id,
+    InstanceType=instance_type,
+    SubnetId=subnet_id,
+    IamInstanceProfile={ "Name": instance_profile },
+    MinCount=1,
+    MaxCount=1,
+    # Standalone Bottlerocket: no cluster to join, admin container to reach containerd through `sheltie`
+    UserData="""
+[settings.host-containers.admin]
+enabled = true
+[settings.host-containers.control]
+enabled = true
+""",
+    BlockDeviceMappings=[
+      { "DeviceName": "/dev/xvdb", "Ebs": { "VolumeSize": volume_size, "VolumeType": "gp3", "Encrypted": True, "DeleteOnTermination": True } },
+    ],
+    TagSpecifications=[
+      { "ResourceType": "instance", "Tags": [{ "Key": "Name", "Value": "bottlerocket-image-cache" }] },
+    ],
+  )["Instances"][0]["InstanceId"]
+
+  try:
+    ec2_client.get_waiter("instance_status_ok").wait(InstanceIds=[instance_id])
+    while not ssm_client.describe_instance_information(Filters=[{ "Key": "InstanceIds", "Values": [instance_id] }])["InstanceInformationList"]:
+      time.sleep(10)
+
+    platform = f"linux/{images_config['arch']}"
+    _ssm_run(ssm_client, instance_id, [
+      f"apiclient exec admin sheltie ctr -n k8s.io images pull --platform {platform} --label io.cri-containerd.image=managed {image}"
+      for image in images_config["images"]
+    ])
+
+    ec2_client.stop_instances(InstanceIds=[instance_id])
+    ec2_client.get_waiter("instance_stopped").wait(InstanceIds=[instance_id])
+
+    volume_id = ec2_client.describe_volumes(
+      Filters=[
+        { "Name": "attachment.instance-id", "Values": [instance_id] },
+        { "Name": "attachment.device", "Values": ["/dev/xvdb"] },
+      ]
+    )["Volumes"][0]["VolumeId"]
+
+    snapshot = ec2_client.create_snapshot(
+      VolumeId=volume_id,
+      Description=f"Bottlerocket data volume with {len(images_config['images'])} cached images",
+      TagSpecifications=[
+        {
+          "ResourceType": "snapshot",
+          "Tags": [
+            { "Key": "Name", "Value": f"bottlerocket-image-cache-{digest}" },
+            { "Key": HASH_TAG, "Value": digest },
+          ],
+        },
+      ],
+    )
+    ec2_client.get_waiter("snapshot_completed").wait(
+      SnapshotIds=[snapshot["SnapshotId"]],
+      WaiterConfig={ "Delay": 15, "MaxAttempts": 240 },
+    )
+  finally:
+    ec2_client.terminate_instances(InstanceIds=[instance_id])
+
+  return snapshot["SnapshotId"]
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Build a Bottlerocket data volume snapshot with cached container images")
+  parser.add_argument("--region", required=True)
+  parser.add_argument("--subnet-id", required=True, help="Subnet with access to SSM and the image registries")
+  parser.add_argument("--instance-profile", required=True, help="Instance profile with the AmazonSSMManagedInstanceCore policy")
+  parser.add_argument("--instance-type", default="t4g.large")
+  parser.add_argument("--volume-size", type=int, default=20, help="Data volume size (GiB), must not exceed the node data volume size")
+  parser.add_argument("--images-file", default=IMAGES_FILE)
+  parser.add_argument("--force", action="store_true", help="Rebuild even if a snapshot for the current image list exists")
+  args = parser.parse_args()
+
+  print(build_snapshot(
+    region=args.region,
+    subnet_id=args.subnet_id,
+    instance_profile=args.instance_profile,
+    instance_type=args.instance_type,
+    volume_size=args.volume_size,
+    images_file=args.images_file,
+    force=args.force,
+  ))
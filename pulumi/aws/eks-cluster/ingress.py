@@ -0,0 +1,107 @@
+import userdata
+
+"""
+Ingress Nginx performance profile, mapped onto the ingress-nginx chart values
+"""
+
+# High-throughput defaults, overridden from the `ingress:performance` config object
+performance_profile = {
+  "worker_processes": "auto",
+  "max_worker_connections": 65536,
+  "upstream_keepalive_connections": 320,
+  "upstream_keepalive_requests": 10000,
+  "upstream_keepalive_timeout": 60,
+  "proxy_buffer_size": "16k",
+  "proxy_buffers_number": 8,
+  "use_http2": True,
+  # Buffered access logs: one write per buffer instead of one per request
+  "access_log_buffer": "64k",
+  "access_log_flush": "5s",
+  "min_replicas": 2,
+  "max_replicas": 10,
+  "target_cpu_utilization": 70,
+  # Requests per second per replica, used for autoscaling when the Prometheus stack is enabled
+  "target_rps_per_replica": 500,
+  "topology_spread": True,
+  "cross_zone_load_balancing": True,
+  # Per-release overrides, keyed by release suffix ( `external`, `internal` )
+  "releases": {},
+}
+
+def get_profile(overrides: dict = {}, release_suffix: str = None)->dict:
+  profile = userdata.deep_merge(performance_profile, overrides)
+  if release_suffix:
+    profile = userdata.deep_merge(profile, profile["releases"].get(release_suffix, {}))
+  return profile
+
+def performance_values(release_name: str, profile: dict, prometheus_address: str = None)->dict:
+  """
+  Chart values for a release; autoscaling on requests per second through KEDA when `prometheus_address` is set, on CPU otherwise
+  """
+  controller = {
+    "config": {
+      "worker-processes": str(profile["worker_processes"]),
+      "max-worker-connections": str(profile["max_worker_connections"]),
+      "upstream-keepalive-connections": str(profile["upstream_keepalive_connections"]),
+      "upstream-keepalive-requests": str(profile["upstream_keepalive_requests"]),
+      "upstream-keepalive-timeout": str(profile["upstream_keepalive_timeout"]),
+      "proxy-buffer-size": profile["proxy_buffer_size"],
+      "proxy-buffers-number": str(profile["proxy_buffers_number"]),
+      "use-http2": "true" if profile["use_http2"] else "false",
+      "access-log-params": f"buffer={profile['access_log_buffer']} flush={profile['access_log_flush']}",
+    },
+  }
+
+  if prometheus_address:
+    controller["autoscaling"] = { "enabled": False }
+    controller["keda"] = {
+      "enabled": True,
+      "apiVersion": "keda.sh/v1alpha1",
+      "minReplicas": profile["min_replicas"],
+      "maxReplicas": profile["max_replicas"],
+      "pollingInterval": 15,
+      "cooldownPeriod": 300,
+      "triggers": [
+        {
+          "type": "prometheus",
+          "metadata": {
+            "serverAddress": prometheus_address,
+            "metricName": "nginx_ingress_controller_requests_per_second",
+            "threshold": str(profile["target_rps_per_replica"]),
+            "query": f'sum(rate(nginx_ingress_controller_requests{{controller_pod=~"{release_name}-controller-.*"}}[1m]))',
+          },
+        },
+      ],
+    }
+  else:
+    controller["autoscaling"] = {
+      "enabled": True,
+      "minReplicas": profile["min_replicas"],
+      "maxReplicas": profile["max_replicas"],
+      "targetCPUUtilizationPercentage": profile["target_cpu_utilization"],
+    }
+
+  if profile["topology_spread"]:
+    controller["topologySpreadConstraints"] = [
+      {
+        "maxSkew": 1,
+        "topologyKey": topology_key,
+        "whenUnsatisfiable": "ScheduleAnyway",
+        "labelSelector": {
+          "matchLabels": {
+            "app.kubernetes.io/name": "ingress-nginx",
+            "app.kubernetes.io/instance": release_name,
+            "app.kubernetes.io/component": "controller",
+          },
+        },
+      }
+      for topology_key in ["topology.kubernetes.io/zone", "kubernetes.io/hostname"]
+    ]
+
+  controller["service"] = {
+    "annotations": {
+      "service.beta.kubernetes.io/aws-load-balancer-attributes": f"load_balancing.cross_zone.enabled={'true' if profile['cross_zone_load_balancing'] else 'false'}",
+    },
+  }
+
+  return { "controller": controller }
@@ -1,23 +1,81 @@
-from pulumi_kubernetes.yaml import ConfigFile, ConfigGroup
+from pulumi_kubernetes.yaml import ConfigGroup
 from pulumi_kubernetes import Provider
 from pulumi import ResourceOptions
 import pulumi
 from os import path
+import copy
 import glob
+import hashlib
+import yaml
+import userdata
+import tuning
 
-def create_resource_from_file(name: str, file: str, depends_on: list = [], provider: Provider = Provider("k8s_default"))->ConfigFile:
+# Parsed manifests, keyed by the SHA-256 of the file contents
+_manifests_cache = {}
+
+def load_manifests(file: str)->list:
+  """
+  Load the objects of a YAML manifest file, relative to this module, parsing each file content only once
+  """
+  file_path = file if path.isabs(file) else path.join(path.dirname(__file__), file)
+  with open(file_path, "rb") as f:
+    content = f.read()
+
+  content_hash = hashlib.sha256(content).hexdigest()
+  if content_hash not in _manifests_cache:
+    _manifests_cache[content_hash] = [ obj for obj in yaml.safe_load_all(content) if obj ]
+
+  # Transformations modify the objects in place, so the cached ones are never handed out
+  return copy.deepcopy(_manifests_cache[content_hash])
+
+def manifest_files(manifests_path: str)->list:
+  manifests_dir = manifests_path if path.isabs(manifests_path) else path.join(path.dirname(__file__), manifests_path)
+  return sorted(glob.glob(path.join(manifests_dir, "*.yaml")))
+
+def load_manifests_path(manifests_path: str)->list:
+  objs = []
+  for file in manifest_files(manifests_path):
+    objs.extend(load_manifests(file))
+  return objs
+
+def transform_manifests(objs: list, transformations: dict)->list:
+  """
+  Apply the transformations registered for each object kind, in a single pass.
+  Objects of a kind without registered transformations, or with a duplicated kind/name, are rejected.
+  """
+  names = set()
+  for obj in objs:
+    kind = obj.get('kind')
+    name = obj.get('metadata', {}).get('name')
+    if kind not in transformations:
+      raise ValueError(f"Unexpected manifest kind '{kind}' for object '{name}', expected one of: {', '.join(transformations.keys())}")
+    if (kind, name) in names:
+      raise ValueError(f"Duplicated manifest {kind}/{name}")
+    names.add((kind, name))
+
+    for transformation in transformations[kind]:
+      transformation(obj)
+
+  return objs
+
+def create_resource_from_objs(name: str, objs: list, depends_on: list = [], provider: Provider = None)->ConfigGroup:
 
   resource_options = ResourceOptions(provider=provider, depends_on=depends_on)
-  resource = ConfigFile(
+  # The Python ConfigGroup only takes YAML, the transformed objects are rendered back into a single document stream
+  resource = ConfigGroup(
     name,
-    file=file,
+    yaml=[yaml.safe_dump_all(objs, sort_keys=False)],
     opts=resource_options
   )
   return resource
 
-def karpenter_templates(name: str, provider: Provider, manifests_path: str, eks_cluster_name: str, depends_on: list = []):
+def create_resource_from_file(name: str, file: str, depends_on: list = [], provider: Provider = None)->ConfigGroup:
 
-    def transform_manifest(obj, opts):
+  return create_resource_from_objs(name=name, objs=load_manifests(file), depends_on=depends_on, provider=provider)
+
+def karpenter_templates(name: str, provider: Provider, manifests_path: str, eks_cluster_name: str, bottlerocket_settings: dict = {}, al2_script: str = "", tuning_profiles: dict = {}, data_volume_snapshot_id: str = None, depends_on: list = [])->ConfigGroup:
+
+    def transform_node_template(obj):
       sg_selector={
         f"kubernetes.io/cluster/{eks_cluster_name}": "owned"
       }
@@ -29,30 +87,52 @@ def karpenter_templates(name: str, provider: Provider, manifests_path: str, eks_
       obj['spec']['securityGroupSelector'] = sg_selector
       obj['spec']['subnetSelector'] = subnet_selector
 
-    files = [
-      path.join(path.dirname("__file__"), file) for file in glob.glob(path.join(path.dirname("__file__"), manifests_path, "*.yaml"))
-    ]
+      # Tuning profile assigned to the template by name
+      profile = tuning_profiles.get(obj['metadata']['name'])
+
+      if obj['spec'].get('amiFamily') == "Bottlerocket":
+        settings = userdata.deep_merge(bottlerocket_settings, tuning.bottlerocket_settings(profile)) if profile else bottlerocket_settings
+        if settings:
+          obj['spec']['userData'] = userdata.bottlerocket_userdata(obj['spec'].get('userData', ""), settings)
+      elif obj['spec'].get('amiFamily') == "AL2":
+        script = "\n".join(part for part in [al2_script, tuning.al2_script(profile) if profile else ""] if part)
+        if script:
+          obj['spec']['userData'] = userdata.al2_userdata(obj['spec'].get('userData', ""), script)
+
+      # Bottlerocket data volume restored from the snapshot with pre-loaded container images
+      if data_volume_snapshot_id and obj['spec'].get('amiFamily') == "Bottlerocket":
+        for mapping in obj['spec'].get('blockDeviceMappings', []):
+          if mapping['deviceName'] == "/dev/xvdb":
+            mapping['ebs']['snapshotID'] = data_volume_snapshot_id
+
+    # Templates were registered by one ConfigFile per manifest file, named after the file: the aliases keep their URNs,
+    # otherwise the templates are created again under the ConfigGroup and the delete of the old ones removes them from the cluster
+    config_files = {}
+    objs = []
+    for file in manifest_files(manifests_path):
+      for obj in load_manifests(file):
+        config_files[obj['metadata']['name']] = path.basename(file)
+        objs.append(obj)
+
+    def alias_config_file(obj, opts):
+      config_file = config_files.get(obj['metadata']['name'])
+      if config_file:
+        opts.aliases = [pulumi.Alias(parent=pulumi.create_urn(config_file, "kubernetes:yaml:ConfigFile"))]
+
+    objs = transform_manifests(
+      objs,
+      {
+        "AWSNodeTemplate": [transform_node_template],
+      }
+    )
 
     resource_options = ResourceOptions(provider=provider, depends_on=depends_on)
 
-    config_files = []
-    for file in files:
-      config_files.append(
-        ConfigFile(
-          name=path.basename(file),
-          file=file,
-          transformations=[transform_manifest],
-          opts=resource_options
-        )
-      )
-
-    #config_group = ConfigGroup(
-    #  name=name,
-    #  files=files,
-    #  transformations=[
-    #    transform_manifest
-    #  ],
-    #  opts=resource_options
-    #)
-
-    return config_files
+    config_group = ConfigGroup(
+      name,
+      yaml=[yaml.safe_dump_all(objs, sort_keys=False)],
+      transformations=[alias_config_file],
+      opts=resource_options
+    )
+
+    return config_group
@@ -0,0 +1,312 @@
+import pulumi
+from pulumi_aws import eks, ec2, get_caller_identity, get_availability_zones
+from pulumi_kubernetes import Provider as kubernetes_provider
+from pulumi_kubernetes.apiextensions import CustomResource
+from pulumi_kubernetes.apps.v1 import DaemonSetPatch
+
+import json
+import iam, iam_roles, tools, userdata, image_cache, tuning, vpc_cni, cilium, dns, layers
+
+from python_pulumi_helm import releases
+
+"""
+Cluster layer: EKS cluster, OIDC provider, default node group, VPC CNI and controller IAM roles
+"""
+aws_config = pulumi.Config("aws")
+aws_region = aws_config.require("region")
+
+aws_eks_config = pulumi.Config("aws-eks-cluster")
+eks_version = aws_eks_config.require("eks_version")
+eks_name_prefix = aws_eks_config.require("name_prefix")
+vpc_cni_config = aws_eks_config.get_object("vpc_cni") or {}
+image_cache_enabled = aws_eks_config.get_bool("image_cache_enabled") or False
+kubeconfig_token_cache = aws_eks_config.get_bool("kubeconfig_token_cache") or False
+node_tuning_profile = aws_eks_config.get("node_tuning_profile")
+
+github_config = pulumi.Config("github")
+github_user = github_config.require("user")
+
+helm_config = pulumi.Config("helm")
+cilium_config = pulumi.Config("cilium")
+
+"""
+Network layer values
+"""
+private_subnet_ids = layers.require("network", "private_subnet_ids")
+pod_subnet_ids = pulumi.Output.from_input(layers.require("network", "pod_subnet_ids"))
+# Pod subnets are created in every AZ when the secondary CIDR is set ( see `vpc.py` )
+pod_networking_enabled = bool(aws_eks_config.get("vpc_pod_cidr"))
+azs = get_availability_zones(state="available").names
+
+"""
+Create EKS cluster
+"""
+eks_cluster = eks.Cluster(
+    name=eks_name_prefix,
+    resource_name=eks_name_prefix,
+    version=eks_version,
+    role_arn=iam_roles.eks_cluster_role.arn,
+    vpc_config=eks.ClusterVpcConfigArgs(
+        endpoint_private_access=True,
+        endpoint_public_access=True,
+        public_access_cidrs=[
+            # Allow access to current public IP to the API server
+            f"{tools.get_public_ip()}/32",
+        ],
+        subnet_ids=private_subnet_ids,
+    ),
+    kubernetes_network_config=eks.ClusterKubernetesNetworkConfigArgs(
+        ip_family="ipv4",
+    ),
+    enabled_cluster_log_types=[
+        "api",
+        "audit",
+    ],
+    tags={
+        "Name": eks_name_prefix,
+        "karpenter.sh/discovery": eks_name_prefix,
+    },
+    opts=pulumi.resource.ResourceOptions(depends_on=[iam_roles.eks_cluster_role]),
+)
+
+oidc_provider = iam.create_oidc_provider(
+    name=f"{eks_name_prefix}-oidc-provider",
+    eks_issuer_url=eks_cluster.identities[0].oidcs[0].issuer,
+    aws_region=aws_region,
+    depends_on=[eks_cluster]
+)
+
+layers.export("cluster", "eks_cluster_name", eks_cluster.name)
+layers.export("cluster", "eks_cluster_endpoint", eks_cluster.endpoint)
+layers.export("cluster", "eks_cluster_certificate_authority", eks_cluster.certificate_authority.apply(lambda ca: ca['data']))
+layers.export("cluster", "eks_cluster_oidc_issuer", eks_cluster.identities[0].oidcs[0].issuer)
+layers.export("cluster", "eks_service_cidr", eks_cluster.kubernetes_network_config.service_ipv4_cidr)
+layers.export("cluster", "oidc_provider_arn", oidc_provider.arn)
+layers.export("cluster", "kubeconfig", tools.create_kubeconfig(eks_cluster=eks_cluster, region=aws_region))
+layers.export("cluster", "eks_node_group_role_instance_profile", iam_roles.ec2_role_instance_profile.name)
+
+aws_account_id = get_caller_identity().account_id
+
+"""
+Create Kubernetes provider from EKS cluster Kubernetes config
+"""
+k8s_provider = kubernetes_provider(
+    "k8s-provider",
+    kubeconfig=tools.create_kubeconfig(eks_cluster=eks_cluster, region=aws_region, token_cache=kubeconfig_token_cache),
+    opts=pulumi.ResourceOptions(depends_on=[eks_cluster]),
+)
+
+"""
+Configure VPC CNI: prefix delegation and custom networking for the pod subnets
+"""
+# Bottlerocket settings shared by the default node group and the Karpenter node templates
+# Pods resolve through the NodeLocal DNSCache ( `helm:node_local_dns` ), installed by the platform layer
+node_bottlerocket_settings = userdata.deep_merge(vpc_cni.bottlerocket_settings(vpc_cni_config), dns.bottlerocket_settings(helm_config.require_bool("node_local_dns")))
+vpc_cni_env = vpc_cni.env(vpc_cni_config, custom_networking=pod_networking_enabled)
+
+require_vpc_cni = []
+if vpc_cni_env:
+    eks_addon_vpc_cni = eks.Addon(
+        f"{eks_name_prefix}-vpc-cni",
+        cluster_name=eks_cluster.name,
+        addon_name="vpc-cni",
+        configuration_values=json.dumps({ "env": vpc_cni_env }),
+        resolve_conflicts="OVERWRITE",
+        opts=pulumi.ResourceOptions(depends_on=[eks_cluster]),
+    )
+    require_vpc_cni = [eks_addon_vpc_cni]
+
+    # ENIConfig objects are named after the AZ, matching the `topology.kubernetes.io/zone` node label
+    for i in range(0, len(azs) if pod_networking_enabled else 0):
+        require_vpc_cni.append(
+            CustomResource(
+                f"eniconfig-{azs[i]}",
+                api_version="crd.k8s.amazonaws.com/v1alpha1",
+                kind="ENIConfig",
+                metadata={
+                    "name": azs[i],
+                },
+                spec={
+                    "subnet": pod_subnet_ids.apply(lambda ids, i=i: ids[i]),
+                    "securityGroups": [
+                        eks_cluster.vpc_config.cluster_security_group_id,
+                    ],
+                },
+                opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=[eks_addon_vpc_cni]),
+            )
+        )
+
+"""
+Get the Bottlerocket data volume snapshot with pre-loaded images, built by `image_cache.py`
+"""
+image_cache_snapshot_id = None
+if image_cache_enabled:
+    image_cache_snapshot_id = image_cache.snapshot_id()
+    if not image_cache_snapshot_id:
+        pulumi.log.warn("No image cache snapshot found for the current image list, run `python image_cache.py` to build it")
+
+"""
+Install Cilium
+"""
+require_cilium = []
+if helm_config.require_bool("cilium"):
+    # eBPF datapath performance profile, applied when `cilium:performance` is set ( `{}` takes the defaults of `cilium.py` )
+    cilium_performance_config = cilium_config.get_object("performance")
+    cilium_profile = cilium.get_profile(cilium_performance_config) if cilium_performance_config is not None else None
+    if cilium_profile:
+        tools.override_release_values(
+            chart="cilium",
+            values=cilium.performance_values(
+                profile=cilium_profile,
+                api_server_host=eks_cluster.endpoint.apply(lambda endpoint: endpoint.replace("https://", "")),
+            ),
+        )
+
+    helm_cilium_chart = releases.cilium(
+        provider=k8s_provider,
+        eks_cluster_name=eks_cluster.name,
+        skip_await=True,
+        depends_on=[eks_cluster],
+    )
+    helm_cilium_chart_status=helm_cilium_chart.status
+    require_cilium = [helm_cilium_chart]
+
+    # Services are handled by Cilium, kube-proxy is moved out of every node once the agents are installed
+    if cilium_profile and cilium.kube_proxy_replaced(cilium_profile):
+        DaemonSetPatch(
+            "kube-proxy",
+            metadata={
+                "name": "kube-proxy",
+                "namespace": "kube-system",
+                "annotations": {
+                    "pulumi.com/patchForce": "true",
+                },
+            },
+            spec={
+                "template": {
+                    "spec": {
+                        "nodeSelector": cilium.kube_proxy_node_selector(),
+                    },
+                },
+            },
+            opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=[helm_cilium_chart]),
+        )
+
+"""
+Create default EKS node group
+"""
+require_default_node_group = []
+if aws_eks_config.require_bool("default_node_group_enabled"):
+    eks_node_group_key_pair = ec2.KeyPair(
+        eks_name_prefix,
+        public_key=tools.get_ssh_public_key_from_gh(github_user),
+    )
+
+    eks_node_group_settings = node_bottlerocket_settings
+    if node_tuning_profile:
+        eks_node_group_settings = userdata.deep_merge(eks_node_group_settings, tuning.bottlerocket_settings(tuning.get_profile(node_tuning_profile)))
+
+    eks_node_group_launch_template = ec2.LaunchTemplate(
+        f"{eks_name_prefix}-system",
+        block_device_mappings=[
+            # Bottlerocket data volume: container images and logs
+            ec2.LaunchTemplateBlockDeviceMappingArgs(
+                device_name="/dev/xvdb",
+                ebs=ec2.LaunchTemplateBlockDeviceMappingEbsArgs(
+                    volume_size=20,
+                    volume_type="gp3",
+                    snapshot_id=image_cache_snapshot_id,
+                    encrypted="true",
+                    delete_on_termination="true",
+                ),
+            ),
+        ],
+        metadata_options=ec2.LaunchTemplateMetadataOptionsArgs(
+            http_endpoint="enabled",
+            http_tokens="required",
+            http_put_response_hop_limit=2,
+        ),
+        user_data=userdata.encode(userdata.toml_dumps(eks_node_group_settings)) if eks_node_group_settings else None,
+        update_default_version=True,
+        tags={
+            "Name": f"{eks_name_prefix}-system",
+        },
+    )
+
+    eks_node_group = eks.NodeGroup(
+        f"{eks_name_prefix}-system",
+        cluster_name=eks_cluster.name,
+        node_group_name="system",
+        node_role_arn=iam_roles.ec2_role.arn,
+        subnet_ids=private_subnet_ids,
+        scaling_config=eks.NodeGroupScalingConfigArgs(
+            desired_size=3,
+            max_size=10,
+            min_size=1,
+        ),
+        instance_types=["t4g.medium"],
+        capacity_type="ON_DEMAND",
+        ami_type="BOTTLEROCKET_ARM_64",
+        launch_template=eks.NodeGroupLaunchTemplateArgs(
+            id=eks_node_group_launch_template.id,
+            version=eks_node_group_launch_template.latest_version.apply(lambda v: str(v)),
+        ),
+        update_config=eks.NodeGroupUpdateConfigArgs(
+            max_unavailable=1,
+        ),
+        taints=[
+            eks.NodeGroupTaintArgs(
+                key=cilium.AGENT_NOT_READY_TAINT["key"],
+                value=cilium.AGENT_NOT_READY_TAINT["value"],
+                effect="NO_EXECUTE",
+            )
+        ] if helm_config.require_bool("cilium") else [],
+        labels={
+            "role": "system",
+        },
+        #remote_access=eks.NodeGroupRemoteAccessArgs(
+        #    ec2_ssh_key=eks_node_group_key_pair.key_name,
+        #    source_security_group_ids=[],
+        #),
+        tags={
+            "Name": f"{eks_name_prefix}-system",
+            "k8s.io/cluster-autoscaler/enabled": "true",
+        },
+        opts=pulumi.ResourceOptions(
+            depends_on=[eks_cluster, eks_node_group_key_pair]
+                        + require_cilium
+                        + require_vpc_cni
+        ),
+    )
+    require_default_node_group = [eks_node_group]
+
+
+"""
+Create cloud controllers service account roles
+"""
+# Try: https://www.pulumi.com/registry/packages/aws-iam/api-docs/roleforserviceaccountseks
+eks_sa_role_aws_load_balancer_controller = iam.create_role_oidc(f"{eks_name_prefix}-aws-load-balancer-controller", oidc_provider.arn)
+eks_sa_role_cluster_autoscaler = iam.create_role_oidc(f"{eks_name_prefix}-cluster-autoscaler", oidc_provider.arn)
+eks_sa_role_external_dns = iam.create_role_oidc(f"{eks_name_prefix}-external-dns", oidc_provider.arn)
+eks_sa_role_karpenter = iam.create_role_oidc(f"{eks_name_prefix}-karpenter", oidc_provider.arn)
+eks_sa_role_ebs_csi_driver = iam.create_role_oidc(f"{eks_name_prefix}-ebs-csi-driver", oidc_provider.arn)
+
+iam.create_role_policy_attachment(f"{eks_name_prefix}-aws-load-balancer-controller", eks_sa_role_aws_load_balancer_controller.name, iam_roles.eks_policy_aws_load_balancer_controller.arn)
+iam.create_role_policy_attachment(f"{eks_name_prefix}-karpenter", eks_sa_role_karpenter.name, iam_roles.eks_policy_karpenter.arn)
+iam.create_role_policy_attachment(f"{eks_name_prefix}-cluster-autoscaler", eks_sa_role_cluster_autoscaler.name, iam_roles.eks_policy_cluster_autoscaler.arn)
+iam.create_role_policy_attachment(f"{eks_name_prefix}-external-dns", eks_sa_role_external_dns.name, iam_roles.eks_policy_external_dns.arn)
+iam.create_role_policy_attachment(f"{eks_name_prefix}-ebs-csi-driver", eks_sa_role_ebs_csi_driver.name, iam_roles.eks_policy_ebs_csi_driver.arn)
+
+"""
+Values and resources used by the platform and observability layers
+"""
+layers.export("cluster", "eks_sa_role_aws_load_balancer_controller_arn", eks_sa_role_aws_load_balancer_controller.arn)
+layers.export("cluster", "eks_sa_role_cluster_autoscaler_arn", eks_sa_role_cluster_autoscaler.arn)
+layers.export("cluster", "eks_sa_role_external_dns_arn", eks_sa_role_external_dns.arn)
+layers.export("cluster", "eks_sa_role_karpenter_arn", eks_sa_role_karpenter.arn)
+layers.export("cluster", "eks_sa_role_ebs_csi_driver_arn", eks_sa_role_ebs_csi_driver.arn)
+
+layers.publish_resources("cluster", "k8s_provider", [k8s_provider])
+layers.publish_resources("cluster", "eks_cluster", [eks_cluster])
+layers.publish_resources("cluster", "default_node_group", require_default_node_group)
+layers.publish_resources("cluster", "cilium", require_cilium)
@@ -0,0 +1,9 @@
+import vpc, layers
+
+"""
+Network layer: VPC, subnets and endpoints
+"""
+layers.export("network", "vpc_id", vpc.vpc.id)
+layers.export("network", "private_subnet_ids", [ s.id for s in vpc.private_subnets ])
+layers.export("network", "pod_subnet_ids", [ s.id for s in vpc.pod_subnets ])
+layers.export("network", "azs", vpc.azs.names)
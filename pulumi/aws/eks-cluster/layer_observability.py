@@ -0,0 +1,363 @@
+import pulumi
+from pulumi_kubernetes.core.v1 import Namespace, Service, Secret
+
+import iam, s3, tools, k8s, prometheus, loki, opensearch_sizing, layers, storage
+
+from python_pulumi_helm import releases
+
+"""
+Observability layer: Prometheus, Thanos, Loki and OpenSearch
+"""
+aws_config = pulumi.Config("aws")
+aws_region = aws_config.require("region")
+
+aws_eks_config = pulumi.Config("aws-eks-cluster")
+kubeconfig_token_cache = aws_eks_config.get_bool("kubeconfig_token_cache") or False
+
+ingress_config = pulumi.Config("ingress")
+ingress_domain_name = ingress_config.require("domain_name")
+
+prometheus_config = pulumi.Config("prometheus")
+thanos_config = pulumi.Config("thanos")
+loki_config = pulumi.Config("loki")
+helm_config = pulumi.Config("helm")
+opensearch_config = pulumi.Config("opensearch")
+storage_config = pulumi.Config("storage")
+
+# StorageClass tier picked by each chart
+storage_classes = storage.get_classes(storage_config.get_object("classes") or {})
+storage_tiers = storage_config.get_object("tiers") or {}
+
+"""
+Cluster and platform layer values
+"""
+k8s_provider = layers.kubernetes_provider(region=aws_region, token_cache=kubeconfig_token_cache)
+oidc_provider_arn = layers.require("cluster", "oidc_provider_arn")
+require_eks_cluster = layers.depends_on("cluster", "eks_cluster")
+require_default_node_group = layers.depends_on("cluster", "default_node_group")
+require_aws_load_balancer_controller = layers.depends_on("platform", "aws_load_balancer_controller")
+karpenter_chart_deps = layers.depends_on("platform", "karpenter")
+ingress_nginx_chart_deps = layers.depends_on("platform", "ingress_nginx")
+require_storage_classes = layers.depends_on("platform", "storage_classes")
+
+"""
+Install Prometheus Stack
+"""
+if helm_config.require_bool("prometheus_stack"):
+    k8s_namespace_prometheus = Namespace(
+        resource_name="prometheus",
+        metadata={
+            "name": "prometheus",
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=require_eks_cluster + require_default_node_group)
+    )
+
+    thanos_s3_bucket_random_string = "0n9f3ofow90m"
+    #thanos_s3_bucket_random_string = pulumi_random.RandomString(
+    #    resource_name="thanos-s3-bucket-random-string",
+    #    length=10,
+    #    special=False,
+    #    upper=False,
+    #    number=False,
+    #    opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=[eks_cluster, eks_node_group])
+    #).result
+    thanos_s3_bucket_name = ""
+    thanos_iam_role_arn = ""
+    thanos_compactor_retention = {
+        "raw": "30d",
+        "5m": "90d",
+        "1h": "1y",
+    }
+
+    if helm_config.require_bool("thanos"):
+        thanos_s3_bucket_name = f"{pulumi.get_stack()}-thanos-{thanos_s3_bucket_random_string}"
+        #thanos_s3_bucket_name = pulumi.Output.concat(pulumi.get_stack(), "-thanos-", thanos_s3_bucket_random_string)
+        eks_sa_role_thanos_storage = iam.create_role_oidc("thanos-storage", oidc_provider_arn)
+        thanos_iam_role_arn = eks_sa_role_thanos_storage.arn
+        thanos_s3_bucket = s3.bucket_with_allowed_roles(
+            name=thanos_s3_bucket_name,
+            acl="private",
+            force_destroy=True,
+            roles=[eks_sa_role_thanos_storage.arn],
+            storage_profile=prometheus.thanos_storage_profile(
+                retention_raw=thanos_compactor_retention["raw"],
+                retention_5m=thanos_compactor_retention["5m"],
+                retention_1h=thanos_compactor_retention["1h"],
+                tiering_after_days=thanos_config.get_int("storage_tiering_after_days") or 14,
+            ),
+        )
+
+    # Sharded series are only complete through Thanos Query
+    prometheus.query_address(shards=prometheus_config.get_int("shards") or 1, thanos_enabled=helm_config.require_bool("thanos"))
+    tools.override_release_values(
+        chart="kube-prometheus-stack",
+        values=prometheus.prometheus_values(
+            shards=prometheus_config.get_int("shards") or 1,
+            remote_write=prometheus_config.get_object("remote_write") or {},
+        ),
+    )
+
+    helm_prometheus_stack_chart = releases.prometheus_stack(
+        aws_region=aws_region,
+        ingress_domain=ingress_domain_name,
+        ingress_class_name="nginx-external",
+        storage_class_name=storage.class_name("prometheus", storage_classes, storage_tiers),
+        prometheus_external_label_env = pulumi.get_stack(),
+        prometheus_tsdb_retention=prometheus_config.require("tsdb_retention"),
+        eks_sa_role_arn=thanos_iam_role_arn,
+        thanos_enabled=helm_config.require_bool("thanos"),
+        name_override="prom-stack",
+        obj_storage_bucket=thanos_s3_bucket_name,
+        karpenter_node_enabled=helm_config.require_bool("karpenter"),
+        provider=k8s_provider,
+        namespace=k8s_namespace_prometheus.metadata.name,
+        depends_on=require_eks_cluster + require_aws_load_balancer_controller
+                    + require_default_node_group
+                    + karpenter_chart_deps
+                    + require_storage_classes
+                    + ingress_nginx_chart_deps,
+    )
+    helm_prometheus_stack_chart_status = helm_prometheus_stack_chart.status
+    # Service name is based on the fullnameOverride of the Prometheus chart ( `name_override="prom-stack"` )
+    prometheus_service = Service.get(
+        resource_name="prom-stack-prometheus-service",
+        id=pulumi.Output.concat(helm_prometheus_stack_chart_status.namespace, "/prom-stack-prometheus"),
+        opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=[helm_prometheus_stack_chart])
+    )
+
+    if helm_config.require_bool("thanos"):
+        # Service name is based on the fullnameOverride of the Prometheus chart ( `name_override="prom-stack"` )
+        prometheus_thanos_service = Service.get(
+            resource_name="prom-stack-prometheus-thanos-service",
+            id=pulumi.Output.concat(helm_prometheus_stack_chart_status.namespace, "/prom-stack-thanos-discovery"),
+            opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=[helm_prometheus_stack_chart])
+        )
+        """
+        Thanos query frontend results cache and store gateway index/chunk caches
+        """
+        thanos_query_cache_config = thanos_config.get_object("query_cache") or {}
+        thanos_store_cache_config = thanos_config.get_object("store_cache") or {}
+        thanos_caches = prometheus.thanos_caches(
+            provider=k8s_provider,
+            namespace=k8s_namespace_prometheus.metadata.name,
+            query_cache=thanos_query_cache_config,
+            store_cache=thanos_store_cache_config,
+            depends_on=require_eks_cluster + require_default_node_group + karpenter_chart_deps,
+        )
+        tools.override_release_values(
+            chart="thanos",
+            values=prometheus.thanos_values(
+                namespace="prometheus",
+                query_cache=thanos_query_cache_config,
+                store_cache=thanos_store_cache_config,
+            ),
+        )
+
+        releases.thanos_stack(
+            aws_region=aws_region,
+            ingress_domain=ingress_domain_name,
+            ingress_class_name="nginx-external",
+            storage_class_name=storage.class_name("thanos", storage_classes, storage_tiers),
+            name_override="thanos-stack",
+            eks_sa_role_arn=thanos_iam_role_arn,
+            obj_storage_bucket=thanos_s3_bucket_name,
+            compactor_enabled=True,
+            compactor_retention_resolution_raw=thanos_compactor_retention["raw"],
+            compactor_retention_resolution_5m=thanos_compactor_retention["5m"],
+            compactor_retention_resolution_1h=thanos_compactor_retention["1h"],
+            karpenter_node_enabled=helm_config.require_bool("karpenter"),
+            provider=k8s_provider,
+            namespace=k8s_namespace_prometheus.metadata.name,
+            depends_on=require_eks_cluster + require_aws_load_balancer_controller
+                        + require_default_node_group
+                        + karpenter_chart_deps
+                        + require_storage_classes
+                        + ingress_nginx_chart_deps
+                        + thanos_caches,
+        )
+
+"""
+Install Loki Stack
+"""
+if helm_config.require_bool("loki_stack"):
+    k8s_namespace_loki = Namespace(
+        resource_name="loki",
+        metadata={
+            "name": "loki",
+        },
+        opts=pulumi.ResourceOptions(
+            provider=k8s_provider,
+            custom_timeouts=pulumi.CustomTimeouts(
+                create="1m",
+                update="5m",
+                delete="20m"
+            ),
+            depends_on=require_eks_cluster + require_default_node_group)
+    )
+
+    loki_s3_bucket_random_string = "0n9f3ofow90m"
+    loki_s3_bucket_name = f"{pulumi.get_stack()}-loki-{loki_s3_bucket_random_string}"
+    eks_sa_role_loki_storage = iam.create_role_oidc("loki-storage", oidc_provider_arn)
+    loki_iam_role_arn = eks_sa_role_loki_storage.arn
+    loki_s3_bucket = s3.bucket_with_allowed_roles(
+        name=loki_s3_bucket_name,
+        acl="private",
+        force_destroy=True,
+        roles=[eks_sa_role_loki_storage.arn],
+        storage_profile=loki.loki_storage_profile(
+            retention_days=loki_config.get_int("retention_days"),
+            tiering_after_days=loki_config.get_int("storage_tiering_after_days") or 7,
+        ),
+    )
+
+    """
+    Loki chunk and results caches, query limits and Promtail batching
+    """
+    loki_singlebinary_enabled = (loki_config.get("mode") or "single-binary") == "single-binary"
+    loki_chunk_cache_config = loki_config.get_object("chunk_cache") or {}
+    loki_results_cache_config = loki_config.get_object("results_cache") or {}
+    loki_promtail_config = loki_config.get_object("promtail") or {}
+    loki_caches = loki.loki_caches(
+        provider=k8s_provider,
+        namespace=k8s_namespace_loki.metadata.name,
+        chunk_cache=loki_chunk_cache_config,
+        results_cache=loki_results_cache_config,
+        depends_on=require_eks_cluster + [k8s_namespace_loki] + require_default_node_group + karpenter_chart_deps,
+    )
+    tools.override_release_values(
+        chart="loki",
+        values=loki.loki_values(
+            namespace="loki",
+            chunk_cache=loki_chunk_cache_config,
+            results_cache=loki_results_cache_config,
+            split_queries_by_interval=loki_config.get("split_queries_by_interval") or "30m",
+            max_query_parallelism=loki_config.get_int("max_query_parallelism") or 32,
+            retention_days=loki_config.get_int("retention_days"),
+            read={} if loki_singlebinary_enabled else loki_config.get_object("read") or {},
+            write={} if loki_singlebinary_enabled else loki_config.get_object("write") or {},
+        ),
+    )
+    tools.override_release_values(
+        chart="promtail",
+        values=loki.promtail_batching(
+            batch_wait=loki_promtail_config.get("batch_wait", "1s"),
+            batch_size=loki_promtail_config.get("batch_size", 1048576),
+        ),
+    )
+
+    helm_loki_stack_chart, helm_loki_promtail_chart = releases.loki(
+        provider=k8s_provider,
+        aws_region=aws_region,
+        ingress_domain=ingress_domain_name,
+        ingress_class_name="nginx-internal",
+        storage_class_name=storage.class_name("loki", storage_classes, storage_tiers),
+        storage_size_read="5Gi",
+        storage_size_write="5Gi",
+        storage_size_backend="5Gi",
+        metrics_enabled=helm_config.require_bool("prometheus_stack"),
+        singlebinary_enabled=loki_singlebinary_enabled,
+        autoscaling_enabled=True,
+        autoscaling_min_replicas= 2,
+        autoscaling_max_replicas= 5,
+        karpenter_node_enabled=helm_config.require_bool("karpenter"),
+        eks_sa_role_arn=loki_iam_role_arn,
+        name_override="loki-stack",
+        obj_storage_bucket=loki_s3_bucket_name,
+        namespace=k8s_namespace_loki.metadata.name,
+        depends_on=require_eks_cluster + [k8s_namespace_loki, loki_s3_bucket]
+                    + require_aws_load_balancer_controller
+                    + require_default_node_group
+                    + karpenter_chart_deps
+                    + require_storage_classes
+                    + ingress_nginx_chart_deps
+                    + loki_caches,
+    )
+    helm_loki_stack_chart_status = helm_loki_stack_chart.status
+    helm_loki_promtail_chart_status = helm_loki_promtail_chart.status
+
+"""
+Install Opensearch cluster
+"""
+if helm_config.require_bool("opensearch"):
+    k8s_namespace_prometheus = Namespace(
+        resource_name="opensearch",
+        metadata={
+            "name": "opensearch",
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=require_eks_cluster + require_default_node_group)
+    )
+
+    """
+    Size the cluster from the expected ingest, retention and query load, when configured
+    """
+    opensearch_sizing_config = opensearch_config.get_object("sizing")
+    if opensearch_sizing_config:
+        opensearch_cluster_sizing = opensearch_sizing.size(
+            ingest_gb_per_day=opensearch_sizing_config["ingest_gb_per_day"],
+            retention_days=opensearch_sizing_config["retention_days"],
+            index_replicas=opensearch_sizing_config.get("index_replicas", 1),
+            query_load=opensearch_sizing_config.get("query_load", "medium"),
+            memory_mb=opensearch_sizing_config.get("memory_mb", 4096),
+            merge_after_days=opensearch_sizing_config.get("merge_after_days"),
+        )
+        opensearch_storage_size = opensearch_cluster_sizing["storage_size"]
+        opensearch_replicas = opensearch_cluster_sizing["nodes"]
+        opensearch_memory_mb = str(opensearch_cluster_sizing["memory_mb"])
+        opensearch_cpu = opensearch_cluster_sizing["cpu"]
+        tools.override_release_values(
+            chart="opensearch",
+            values=opensearch_sizing.release_values(opensearch_cluster_sizing),
+        )
+        pulumi.export("opensearch_sizing", opensearch_cluster_sizing)
+    else:
+        opensearch_storage_size = opensearch_config.require("storage_size")
+        opensearch_replicas = opensearch_config.require_int("replicas")
+        opensearch_memory_mb = opensearch_config.require("memory_mb")
+        opensearch_cpu = opensearch_config.require("cpu")
+
+    helm_opensearch_chart = releases.opensearch(
+        ingress_domain=ingress_domain_name,
+        ingress_class_name="nginx-internal",
+        storage_class_name=storage.class_name("opensearch", storage_classes, storage_tiers),
+        storage_size=opensearch_storage_size,
+        replicas=opensearch_replicas,
+        karpenter_node_enabled=helm_config.require_bool("karpenter"),
+        karpenter_node_provider_name="default",
+        resources_requests_memory_mb=opensearch_memory_mb,
+        resources_requests_cpu=opensearch_cpu,
+        provider=k8s_provider,
+        namespace=k8s_namespace_prometheus.metadata.name,
+        depends_on=require_eks_cluster + require_aws_load_balancer_controller
+                    + require_default_node_group
+                    + karpenter_chart_deps
+                    + require_storage_classes
+                    + ingress_nginx_chart_deps,
+    )
+
+    """
+    Apply index templates and ISM policies through the OpenSearch API
+    """
+    if opensearch_sizing_config:
+        opensearch_admin_secret = Secret(
+            resource_name="opensearch-admin",
+            metadata={
+                "name": "opensearch-admin",
+                "namespace": k8s_namespace_prometheus.metadata.name,
+            },
+            string_data={
+                "username": "admin",
+                "password": opensearch_config.require_secret("admin_password"),
+            },
+            opts=pulumi.ResourceOptions(provider=k8s_provider),
+        )
+        k8s.create_resource_from_objs(
+            name="opensearch-bootstrap",
+            objs=opensearch_sizing.bootstrap_manifests(
+                sizing=opensearch_cluster_sizing,
+                namespace="opensearch",
+                index_prefix=opensearch_sizing_config.get("index_prefix", "logs"),
+                credentials_secret="opensearch-admin",
+            ),
+            provider=k8s_provider,
+            depends_on=[helm_opensearch_chart, opensearch_admin_secret],
+        )
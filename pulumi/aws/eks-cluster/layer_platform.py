@@ -0,0 +1,521 @@
+import pulumi
+from pulumi_aws import eks, get_caller_identity
+from pulumi_kubernetes.core.v1 import Namespace, ServiceAccount
+
+import iam, tools, userdata, k8s, image_cache, provisioners, tuning, ingress, charts, argocd_sizing, vpc_cni, layers, readiness, workloads, storage, snapshots, cilium, dns, registry_mirrors, prometheus
+
+from python_pulumi_helm import releases
+
+"""
+Platform layer: cloud controllers, Karpenter, ingress controllers and ArgoCD
+"""
+aws_config = pulumi.Config("aws")
+aws_region = aws_config.require("region")
+
+aws_eks_config = pulumi.Config("aws-eks-cluster")
+eks_name_prefix = aws_eks_config.require("name_prefix")
+vpc_cni_config = aws_eks_config.get_object("vpc_cni") or {}
+image_cache_enabled = aws_eks_config.get_bool("image_cache_enabled") or False
+kubeconfig_token_cache = aws_eks_config.get_bool("kubeconfig_token_cache") or False
+
+ingress_config = pulumi.Config("ingress")
+ingress_acm_cert_arn = ingress_config.require("acm_certificate_arn")
+ingress_domain_name = ingress_config.require("domain_name")
+
+helm_config = pulumi.Config("helm")
+karpenter_config = pulumi.Config("karpenter")
+argocd_config = pulumi.Config("argocd")
+dns_config = pulumi.Config("dns")
+prometheus_config = pulumi.Config("prometheus")
+workloads_config = pulumi.Config("workloads")
+storage_config = pulumi.Config("storage")
+bitcoin_config = pulumi.Config("bitcoin")
+
+"""
+Cluster layer values
+"""
+k8s_provider = layers.kubernetes_provider(region=aws_region, token_cache=kubeconfig_token_cache)
+readiness_kubeconfig = layers.kubeconfig(region=aws_region, token_cache=kubeconfig_token_cache)
+eks_cluster_name = layers.require("cluster", "eks_cluster_name")
+eks_cluster_endpoint = layers.require("cluster", "eks_cluster_endpoint")
+require_eks_cluster = layers.depends_on("cluster", "eks_cluster")
+require_default_node_group = layers.depends_on("cluster", "default_node_group")
+require_cilium = layers.depends_on("cluster", "cilium")
+
+"""
+Create Kubernetes namespaces
+"""
+k8s_namespace_controllers = Namespace(
+    resource_name="cloud-controllers",
+    metadata={
+        "name": "cloud-controllers",
+    },
+    opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=require_eks_cluster + require_default_node_group)
+)
+
+"""
+Create Helm charts
+"""
+
+"""
+Install AWS Load Balancer Controller
+"""
+helm_aws_load_balancer_controller_chart = releases.aws_load_balancer_controller(
+    provider=k8s_provider,
+    aws_region=aws_region,
+    aws_vpc_id=layers.require("network", "vpc_id"),
+    eks_sa_role_arn=layers.require("cluster", "eks_sa_role_aws_load_balancer_controller_arn"),
+    eks_cluster_name=eks_cluster_name,
+    namespace=k8s_namespace_controllers.metadata.name,
+    depends_on=require_eks_cluster + require_default_node_group + require_cilium,
+)
+
+helm_aws_load_balancer_controller_chart_status = helm_aws_load_balancer_controller_chart.status
+
+# Services and ingresses are mutated by the controller webhook, charts creating them wait for its endpoints only
+aws_load_balancer_webhook_ready = readiness.webhook_ready(
+    resource_name="aws-load-balancer-webhook-ready",
+    service="aws-load-balancer-webhook-service",
+    namespace=helm_aws_load_balancer_controller_chart_status.namespace,
+    kubeconfig=readiness_kubeconfig,
+    release=helm_aws_load_balancer_controller_chart,
+)
+
+"""
+Install External DNS
+"""
+helm_external_dns_chart = releases.external_dns(
+    provider=k8s_provider,
+    eks_sa_role_arn=layers.require("cluster", "eks_sa_role_external_dns_arn"),
+    namespace=k8s_namespace_controllers.metadata.name,
+    depends_on=require_eks_cluster + require_default_node_group,
+)
+helm_external_dns_chart_status=helm_external_dns_chart.status
+
+"""
+Install Cluster Autoscaler
+"""
+helm_cluster_autoscaler_chart = releases.cluster_autoscaler(
+    provider=k8s_provider,
+    aws_region=aws_region,
+    eks_sa_role_arn=layers.require("cluster", "eks_sa_role_cluster_autoscaler_arn"),
+    eks_cluster_name=eks_cluster_name,
+    namespace=k8s_namespace_controllers.metadata.name,
+    depends_on=require_eks_cluster + require_default_node_group,
+)
+
+"""
+Install AWS CSI Driver
+"""
+storage_class_deps = []
+if helm_config.require_bool("aws_csi_driver"):
+    helm_ebs_csi_driver_chart = releases.aws_ebs_csi_driver(
+        provider=k8s_provider,
+        eks_sa_role_arn=layers.require("cluster", "eks_sa_role_ebs_csi_driver_arn"),
+        default_storage_class_name=storage.DEFAULT_CLASS,
+        namespace=k8s_namespace_controllers.metadata.name,
+        depends_on=require_eks_cluster + require_default_node_group
+    )
+    helm_ebs_csi_driver_chart_status=helm_ebs_csi_driver_chart.status
+    storage_class_deps.append(helm_ebs_csi_driver_chart)
+
+    """
+    Install the CSI snapshot controller and the EBS VolumeSnapshotClass
+    """
+    eks_addon_snapshot_controller = eks.Addon(
+        f"{eks_name_prefix}-snapshot-controller",
+        cluster_name=eks_cluster_name,
+        addon_name="snapshot-controller",
+        resolve_conflicts="OVERWRITE",
+        opts=pulumi.ResourceOptions(depends_on=require_eks_cluster + require_default_node_group),
+    )
+    snapshot_crd_ready = readiness.crd_ready(
+        resource_name="volumesnapshotclasses.snapshot.storage.k8s.io-ready",
+        crd="volumesnapshotclasses.snapshot.storage.k8s.io",
+        kubeconfig=readiness_kubeconfig,
+        depends_on=[eks_addon_snapshot_controller],
+    )
+    snapshot_class = k8s.create_resource_from_objs(
+        name="volume-snapshot-class",
+        objs=[snapshots.snapshot_class(eks_name_prefix)],
+        provider=k8s_provider,
+        depends_on=[snapshot_crd_ready, helm_ebs_csi_driver_chart],
+    )
+
+"""
+Create the StorageClass tiers, EBS ones need the CSI driver
+"""
+storage_classes = storage.get_classes(storage_config.get_object("classes") or {})
+storage_class_objs = storage.generate_storage_classes(storage_classes, ebs_enabled=helm_config.require_bool("aws_csi_driver"))
+if storage_class_objs:
+    storage_class_deps.append(
+        k8s.create_resource_from_objs(
+            name="storage-classes",
+            objs=storage_class_objs,
+            provider=k8s_provider,
+            depends_on=require_eks_cluster + storage_class_deps,
+        )
+    )
+
+storage_local_classes = storage.local_classes(storage_classes)
+if storage_local_classes:
+    storage_class_deps.append(
+        charts.local_static_provisioner(
+            provider=k8s_provider,
+            values=storage.local_provisioner_values(storage_local_classes),
+            namespace=k8s_namespace_controllers.metadata.name,
+            depends_on=require_eks_cluster + require_default_node_group,
+        )
+    )
+
+
+"""
+Install Metrics Server
+"""
+if helm_config.require_bool("metrics_server"):
+    helm_metrics_server_chart = releases.metrics_server(
+        provider=k8s_provider,
+        depends_on=require_eks_cluster + require_default_node_group,
+    )
+    helm_metrics_server_chart_status=helm_metrics_server_chart.status
+
+"""
+Install NodeLocal DNSCache, and scale CoreDNS from the cluster size
+"""
+if helm_config.require_bool("node_local_dns"):
+    charts.node_local_dns(
+        provider=k8s_provider,
+        values=dns.node_local_dns_values(
+            kube_dns_ip=pulumi.Output.from_input(layers.require("cluster", "eks_service_cidr")).apply(dns.kube_dns_ip),
+        ),
+        depends_on=require_eks_cluster + require_default_node_group + require_cilium,
+    )
+    charts.cluster_proportional_autoscaler(
+        name="coredns-autoscaler",
+        provider=k8s_provider,
+        values=dns.coredns_autoscaler_values(dns_config.get_object("coredns_autoscaling") or {}),
+        depends_on=require_eks_cluster + require_default_node_group,
+    )
+
+"""
+Install Karpenter
+"""
+karpenter_chart_deps = []
+if helm_config.require_bool("karpenter"):
+    helm_karpenter_chart = releases.karpenter(
+        namespace=k8s_namespace_controllers.metadata.name,
+        provider=k8s_provider,
+        eks_sa_role_arn=layers.require("cluster", "eks_sa_role_karpenter_arn"),
+        eks_cluster_name=eks_cluster_name,
+        eks_cluster_endpoint=eks_cluster_endpoint,
+        default_instance_profile_name=layers.require("cluster", "eks_node_group_role_instance_profile"),
+        depends_on=require_eks_cluster + [aws_load_balancer_webhook_ready] + require_default_node_group,
+    )
+
+    helm_karpenter_chart_status = helm_karpenter_chart.status
+
+    # AWSNodeTemplates and Provisioners need the CRDs established and the webhooks serving
+    karpenter_webhook_ready = readiness.webhook_ready(
+        resource_name="karpenter-webhook-ready",
+        service=helm_karpenter_chart_status.name,
+        namespace=helm_karpenter_chart_status.namespace,
+        kubeconfig=readiness_kubeconfig,
+        release=helm_karpenter_chart,
+    )
+    karpenter_crds_ready = [
+        readiness.crd_ready(
+            resource_name=f"{crd}-ready",
+            crd=crd,
+            kubeconfig=readiness_kubeconfig,
+            depends_on=[helm_karpenter_chart],
+        ) for crd in ["provisioners.karpenter.sh", "awsnodetemplates.karpenter.k8s.aws"]
+    ]
+
+    """
+    Create cluster-wide AWSNodeTemplates
+    """
+    # ECR pull-through cache mirrors of the AL2 node templates ( `aws-eks-cluster:registry_mirrors` )
+    registry_mirrors_config = aws_eks_config.get_object("registry_mirrors")
+    node_registry_mirrors = registry_mirrors.get_mirrors(registry_mirrors_config) if registry_mirrors_config is not None else {}
+    ecr_registry = registry_mirrors.ecr_registry(get_caller_identity().account_id, aws_region)
+
+    karpenter_template_default = k8s.karpenter_templates(
+        name="karpenter-awsnodetemplate",
+        manifests_path="k8s/manifests/karpenter/awsnodetemplate",
+        eks_cluster_name=eks_name_prefix,
+        bottlerocket_settings=userdata.deep_merge(vpc_cni.bottlerocket_settings(vpc_cni_config), dns.bottlerocket_settings(helm_config.require_bool("node_local_dns"))),
+        al2_script=registry_mirrors.al2_script(node_registry_mirrors, ecr_registry, aws_region),
+        tuning_profiles={ template: tuning.get_profile(profile) for template, profile in (karpenter_config.get_object("node_template_profiles") or {}).items() },
+        data_volume_snapshot_id=image_cache.snapshot_id() if image_cache_enabled else None,
+        provider=k8s_provider,
+        depends_on=[karpenter_webhook_ready] + karpenter_crds_ready,
+    )
+    
+    """
+    Create Provisioners from the workload classes
+    """
+    karpenter_provisioners = k8s.create_resource_from_objs(
+        name="karpenter-provisioners",
+        objs=provisioners.generate_provisioners(
+            classes=karpenter_config.get_object("provisioners") or provisioners.workload_classes,
+            kubelet_configuration={ **vpc_cni.kubelet_configuration(vpc_cni_config), **dns.kubelet_configuration(helm_config.require_bool("node_local_dns")) },
+            # Same Cilium taint as the default node group, removed by the agent once ready
+            startup_taints=[cilium.AGENT_NOT_READY_TAINT] if helm_config.require_bool("cilium") else [],
+        ),
+        provider=k8s_provider,
+        depends_on=[karpenter_webhook_ready, karpenter_template_default] + karpenter_crds_ready,
+    )
+
+    karpenter_chart_deps.append(helm_karpenter_chart)
+    karpenter_chart_deps.append(karpenter_template_default)
+    karpenter_chart_deps.append(karpenter_provisioners)
+
+"""
+Install KEDA, autoscaling on request rates from the ingress-nginx metrics in Prometheus
+"""
+prometheus_address = None
+require_keda = []
+if helm_config.require_bool("prometheus_stack"):
+    # Thanos Query when Prometheus is sharded, a single shard only sees part of the ingress request rates
+    prometheus_address = prometheus.query_address(
+        shards=prometheus_config.get_int("shards") or 1,
+        thanos_enabled=helm_config.require_bool("thanos"),
+    )
+    helm_keda_chart = charts.keda(
+        provider=k8s_provider,
+        depends_on=require_eks_cluster + require_default_node_group,
+    )
+    keda_crd_ready = readiness.crd_ready(
+        resource_name="scaledobjects.keda.sh-ready",
+        crd="scaledobjects.keda.sh",
+        kubeconfig=readiness_kubeconfig,
+        depends_on=[helm_keda_chart],
+    )
+    require_keda = [keda_crd_ready]
+
+"""
+Install ingress Nginx controllers
+"""
+ingress_nginx_chart_deps = []
+if helm_config.require_bool("ingress_nginx"):
+    k8s_namespace_ingress = Namespace(
+        resource_name="ingress",
+        metadata={
+            "name": "ingress",
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=require_eks_cluster + require_default_node_group)
+    )
+
+    """
+    Map the ingress performance profile onto the chart values of both releases
+    """
+    ingress_performance_config = ingress_config.get_object("performance") or {}
+    ingress_prometheus_address = None
+    if require_keda and ingress.get_profile(ingress_performance_config)["target_rps_per_replica"]:
+        # Autoscaling on requests per second
+        ingress_prometheus_address = prometheus_address
+
+    for ingress_release_name, ingress_release_suffix in [("ingress-nginx-internet-facing", "external"), ("ingress-nginx-internal", "internal")]:
+        tools.override_release_values(
+            chart="ingress-nginx",
+            release_name=ingress_release_name,
+            values=ingress.performance_values(
+                release_name=ingress_release_name,
+                profile=ingress.get_profile(ingress_performance_config, ingress_release_suffix),
+                prometheus_address=ingress_prometheus_address,
+            ),
+        )
+
+    helm_ingress_nginx_external_chart = releases.ingress_nginx(
+        provider=k8s_provider,
+        name="ingress-nginx-internet-facing",
+        name_suffix="external",
+        public=True,
+        ssl_enabled=True,
+        acm_cert_arns=[ingress_acm_cert_arn],
+        alb_resource_tags={ "eks-cluster-name": eks_name_prefix, "ingress-name": "ingress-nginx-internet-facing" },
+        metrics_enabled=helm_config.require_bool("prometheus_stack"),
+        global_rate_limit_enabled=True,
+        karpenter_node_enabled=helm_config.require_bool("karpenter"),
+        namespace=k8s_namespace_ingress.metadata.name,
+        depends_on=require_eks_cluster + [aws_load_balancer_webhook_ready]
+                    + require_default_node_group
+                    + karpenter_chart_deps
+                    + require_keda,
+    )
+    helm_ingress_nginx_chart_status=helm_ingress_nginx_external_chart.status
+
+    helm_ingress_nginx_internal_chart = releases.ingress_nginx(
+        provider=k8s_provider,
+        name="ingress-nginx-internal",
+        name_suffix="internal",
+        public=False,
+        ssl_enabled=True,
+        acm_cert_arns=[ingress_acm_cert_arn],
+        alb_resource_tags={ "eks-cluster-name": eks_name_prefix, "ingress-name": "ingress-nginx-internal" },
+        metrics_enabled=helm_config.require_bool("prometheus_stack"),
+        global_rate_limit_enabled=False,
+        karpenter_node_enabled=helm_config.require_bool("karpenter"),
+        namespace=k8s_namespace_ingress.metadata.name,
+        depends_on=require_eks_cluster + [aws_load_balancer_webhook_ready]
+                    + require_default_node_group
+                    + karpenter_chart_deps
+                    + require_keda,
+    )
+    helm_ingress_nginx_internal_chart_status=helm_ingress_nginx_internal_chart.status
+
+    ingress_nginx_chart_deps = [helm_ingress_nginx_external_chart, helm_ingress_nginx_internal_chart]
+
+    #ingress_internet_facing_nlb = elasticloadbalancingv2.get_load_balancer(
+    #    tags={ "eks-cluster-name": eks_name_prefix, "ingress-name": "ingress-nginx-internet-facing" },
+    #    opts=pulumi.InvokeOptions(parent=helm_ingress_nginx_chart)
+    #)
+    
+    #ingress_internal_nlb = elasticloadbalancingv2.get_load_balancer(
+    #    tags={ "eks-cluster-name": eks_name_prefix, "ingress-name": "ingress-nginx-internal" },
+    #    opts=pulumi.InvokeOptions(parent=helm_ingress_nginx_internal_chart)
+    #)
+    
+    #pulumi.export("ingress_internet_facing_nlb", ingress_internet_facing_nlb.dns_name)
+    #pulumi.export("ingress_internal_nlb", ingress_internal_nlb.dns_name)
+
+"""
+Autoscale the sample workloads ( fastapi, nginx ) on their ingress request rate
+"""
+if require_keda and helm_config.require_bool("ingress_nginx"):
+    k8s.create_resource_from_objs(
+        name="workloads-autoscaling",
+        objs=workloads.generate_autoscaling(
+            workloads=workloads.get_workloads(workloads_config.get_object("autoscaling") or {}),
+            # Same Thanos Query address as the ingress controllers when Prometheus is sharded
+            prometheus_address=prometheus_address,
+        ),
+        provider=k8s_provider,
+        depends_on=require_keda,
+    )
+
+"""
+Deploy the bitcoin node, new replicas restored from the latest snapshot of the chainstate volume of the first one
+"""
+if bitcoin_config.get_bool("enabled") and helm_config.require_bool("aws_csi_driver"):
+    bitcoin_namespace = "btc"
+    bitcoin_claim = "bitcoin-data-bitcoin-node-0"
+    k8s_namespace_bitcoin = Namespace(
+        resource_name=bitcoin_namespace,
+        metadata={
+            "name": bitcoin_namespace,
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=require_eks_cluster + require_default_node_group)
+    )
+
+    # Fast snapshot restore is billed per snapshot and AZ, so it is only enabled in the configured AZs
+    bitcoin_fsr_azs = bitcoin_config.get_object("fast_snapshot_restore_azs") or []
+    bitcoin_snapshots_sa_annotations = {}
+    if bitcoin_fsr_azs:
+        eks_sa_role_bitcoin_snapshots = iam.create_role_oidc("bitcoin-node-snapshots", layers.require("cluster", "oidc_provider_arn"))
+        iam.create_role_policy_attachment(
+            "bitcoin-node-snapshots",
+            role_name=eks_sa_role_bitcoin_snapshots.name,
+            policy_arn=iam.create_policy_from_file(f"{eks_name_prefix}-bitcoin-node-fast-snapshot-restore", "iam/policies/fast-snapshot-restore.json").arn,
+        )
+        bitcoin_snapshots_sa_annotations = { "eks.amazonaws.com/role-arn": eks_sa_role_bitcoin_snapshots.arn }
+
+    bitcoin_snapshots_sa = ServiceAccount(
+        resource_name="bitcoin-node-snapshots",
+        metadata={
+            "name": "bitcoin-node-snapshots",
+            "namespace": k8s_namespace_bitcoin.metadata.name,
+            "annotations": bitcoin_snapshots_sa_annotations,
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider),
+    )
+
+    bitcoin_storage_class = storage.class_name("bitcoin-node", storage_classes, storage_config.get_object("tiers") or {})
+    bitcoin_transformations = {
+        "Service": [],
+        "Provisioner": [],
+        "StatefulSet": [lambda obj: storage.set_claims_class(obj, bitcoin_storage_class)],
+    }
+    # Claims restored from the `-latest` snapshot, only set once a scheduled snapshot exists ( the claim templates of a StatefulSet cannot change )
+    if bitcoin_config.get_bool("restore_from_snapshot"):
+        bitcoin_transformations["StatefulSet"].append(lambda obj: snapshots.restore_claim_templates(obj, "bitcoin-data"))
+
+    bitcoin_objs = [
+        obj for obj in k8s.load_manifests_path("k8s/manifests/bitcoin-node")
+        if obj["kind"] != "Namespace" and (helm_config.require_bool("karpenter") or obj["kind"] != "Provisioner")
+    ]
+    k8s.create_resource_from_objs(
+        name="bitcoin-node",
+        objs=k8s.transform_manifests(bitcoin_objs, bitcoin_transformations)
+            + snapshots.snapshot_schedule(
+                name="bitcoin-node-snapshots",
+                namespace=bitcoin_namespace,
+                claim=bitcoin_claim,
+                schedule=bitcoin_config.get("snapshot_schedule") or "0 */12 * * *",
+                service_account="bitcoin-node-snapshots",
+                keep=bitcoin_config.get_int("snapshot_keep") or 3,
+                fast_snapshot_restore_azs=bitcoin_fsr_azs,
+                region=aws_region,
+            ),
+        provider=k8s_provider,
+        depends_on=[k8s_namespace_bitcoin, bitcoin_snapshots_sa, snapshot_class]
+                    + storage_class_deps
+                    + karpenter_chart_deps,
+    )
+
+"""
+Install ArgoCD
+"""
+if helm_config.require_bool("argocd"):
+    k8s_namespace_argocd = Namespace(
+        resource_name="argocd",
+        metadata={
+            "name": "argocd",
+        },
+        opts=pulumi.ResourceOptions(provider=k8s_provider, depends_on=require_eks_cluster + require_default_node_group)
+    )
+
+    """
+    Size controller shards, processors and repo-server from the expected applications and clusters
+    """
+    argocd_application_controller_replicas = argocd_config.require_int("application_controller_replicas")
+    argocd_sizing_config = argocd_config.get_object("sizing")
+    if argocd_sizing_config:
+        argocd_cluster_sizing = argocd_sizing.size(
+            applications=argocd_sizing_config["applications"],
+            clusters=argocd_sizing_config.get("clusters", 1),
+            controller_replicas=argocd_application_controller_replicas,
+        )
+        # Explicit values in the config take precedence over the derived ones
+        argocd_cluster_sizing.update({ k: v for k, v in argocd_sizing_config.items() if k in argocd_cluster_sizing })
+        argocd_application_controller_replicas = argocd_cluster_sizing["controller_replicas"]
+        tools.override_release_values(
+            chart="argo-cd",
+            values=argocd_sizing.release_values(argocd_cluster_sizing),
+        )
+        pulumi.export("argocd_sizing", argocd_cluster_sizing)
+
+    releases.argocd(
+        ingress_hostname=f"argocd.{ingress_domain_name}",
+        ingress_protocol="https",
+        ingress_class_name="nginx-external",
+        argocd_redis_ha_enabled=argocd_config.require_bool("ha_enabled"),
+        argocd_redis_ha_haproxy_enabled=True,
+        argocd_application_controller_replicas=argocd_application_controller_replicas,
+        argocd_applicationset_controller_replicas=argocd_config.require_int("applicationset_controller_replicas"),
+        karpenter_node_enabled=helm_config.require_bool("karpenter"),
+        provider=k8s_provider,
+        namespace=k8s_namespace_argocd.metadata.name,
+        depends_on=require_eks_cluster + [aws_load_balancer_webhook_ready]
+                    + require_default_node_group
+                    + karpenter_chart_deps
+                    + ingress_nginx_chart_deps,
+    )
+
+"""
+Resources the observability layer waits for, when evaluated in the same stack
+"""
+layers.publish_resources("platform", "aws_load_balancer_controller", [aws_load_balancer_webhook_ready])
+layers.publish_resources("platform", "karpenter", karpenter_chart_deps)
+layers.publish_resources("platform", "ingress_nginx", ingress_nginx_chart_deps)
+layers.publish_resources("platform", "storage_classes", storage_class_deps)
@@ -0,0 +1,82 @@
+import pulumi
+from pulumi_kubernetes import Provider
+import tools
+
+"""
+Layered stacks: network, cluster, platform add-ons and observability.
+A stack runs every layer ( `all` ) or a single one, set with `aws-eks-cluster:layer`.
+Values of the layers evaluated in the same stack are passed in-process, the others are read through a StackReference.
+"""
+
+LAYERS = ["network", "cluster", "platform", "observability"]
+
+aws_eks_config = pulumi.Config("aws-eks-cluster")
+current = aws_eks_config.get("layer") or "all"
+# Stack of each layer, by default the current stack name with the layer suffix replaced ( `dev-platform` -> `dev-network` )
+layer_stacks = aws_eks_config.get_object("layer_stacks") or {}
+
+if current not in LAYERS + ["all"]:
+  raise ValueError(f"Unknown layer '{current}', expected one of: {', '.join(LAYERS + ['all'])}")
+
+# Values and resources published by the layers evaluated in this stack
+_outputs = {}
+_resources = {}
+_references = {}
+
+def enabled(layer: str)->bool:
+  return current in ["all", layer]
+
+def stack_name(layer: str)->str:
+  if layer in layer_stacks:
+    return layer_stacks[layer]
+  base_stack = pulumi.get_stack()
+  if base_stack.endswith(f"-{current}"):
+    base_stack = base_stack[:-len(f"-{current}")]
+  return f"{pulumi.get_organization()}/{pulumi.get_project()}/{base_stack}-{layer}"
+
+def reference(layer: str)->pulumi.StackReference:
+  if layer not in _references:
+    _references[layer] = pulumi.StackReference(f"{layer}-layer", stack_name=stack_name(layer))
+  return _references[layer]
+
+def export(layer: str, name: str, value):
+  _outputs[(layer, name)] = value
+  pulumi.export(name, value)
+
+def require(layer: str, name: str):
+  """
+  Value exported by a layer, from this stack or from the layer stack
+  """
+  if enabled(layer):
+    return _outputs[(layer, name)]
+  return reference(layer).require_output(name)
+
+def publish_resources(layer: str, name: str, resources: list):
+  _resources[(layer, name)] = resources
+
+def depends_on(layer: str, name: str)->list:
+  """
+  Resources published by a layer evaluated in this stack.
+  Layers in other stacks are already deployed, so there is nothing to wait for.
+  """
+  return _resources.get((layer, name), [])
+
+def kubernetes_provider(region: str, token_cache: bool = False)->Provider:
+  """
+  Provider of the cluster layer when evaluated in this stack, otherwise built from its outputs
+  """
+  if enabled("cluster"):
+    return _resources[("cluster", "k8s_provider")][0]
+  return Provider("k8s-provider", kubeconfig=kubeconfig(region, token_cache))
+
+def kubeconfig(region: str, token_cache: bool = False):
+  """
+  Kubeconfig built from the cluster layer outputs, for clients outside of the Kubernetes provider
+  """
+  return tools.kubeconfig(
+    cluster_name=require("cluster", "eks_cluster_name"),
+    endpoint=require("cluster", "eks_cluster_endpoint"),
+    certificate_authority_data=require("cluster", "eks_cluster_certificate_authority"),
+    region=region,
+    token_cache=token_cache,
+  )
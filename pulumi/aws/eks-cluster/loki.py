@@ -0,0 +1,127 @@
+import copy
+import charts
+
+"""
+Loki query path caching, query limits and ingestion batching, merged into the `loki` and `promtail` releases
+"""
+
+def loki_values(namespace: str, chunk_cache: dict = {}, results_cache: dict = {}, split_queries_by_interval: str = "30m", max_query_parallelism: int = 32, retention_days: int = None, read: dict = {}, write: dict = {})->dict:
+  values = {
+    "loki": {
+      "limits_config": {
+        "split_queries_by_interval": split_queries_by_interval,
+        "max_query_parallelism": max_query_parallelism,
+      },
+      "memcached": {},
+    },
+  }
+
+  # Compactor retention, deleting the expired chunks and index entries ( the bucket lifecycle only follows as a safety net )
+  if retention_days:
+    values["loki"]["limits_config"]["retention_period"] = f"{retention_days * 24}h"
+    values["loki"]["compactor"] = {
+      "retention_enabled": True,
+      "retention_delete_delay": "2h",
+    }
+
+  if chunk_cache:
+    values["loki"]["memcached"]["chunk_cache"] = {
+      "enabled": True,
+      "host": f"loki-chunk-cache.{namespace}.svc.cluster.local",
+      "service": "memcache",
+      "batch_size": chunk_cache.get("batch_size", 256),
+      "parallelism": chunk_cache.get("parallelism", 10),
+    }
+
+  if results_cache:
+    values["loki"]["memcached"]["results_cache"] = {
+      "enabled": True,
+      "host": f"loki-results-cache.{namespace}.svc.cluster.local",
+      "service": "memcache",
+      "timeout": results_cache.get("timeout", "500ms"),
+      "default_validity": results_cache.get("default_validity", "12h"),
+    }
+
+  # Simple scalable mode: read and write paths scale independently
+  for target, scaling in [("read", read), ("write", write)]:
+    if scaling:
+      values[target] = {
+        "autoscaling": {
+          "enabled": True,
+          "minReplicas": scaling.get("min_replicas", 2),
+          "maxReplicas": scaling.get("max_replicas", 6),
+          "targetCPUUtilizationPercentage": scaling.get("target_cpu_utilization", 70),
+        },
+      }
+
+  return values
+
+def promtail_batching(batch_wait: str = "1s", batch_size: int = 1048576):
+  """
+  Update the batching of every Promtail client, keeping the clients URLs set by the release
+  """
+  def update_values(values: dict)->dict:
+    clients = values.get("config", {}).get("clients")
+    # Without clients the chart defaults are kept, a client without `url` stops Promtail
+    if not clients:
+      return values
+    values = copy.deepcopy(values)
+    for client in values["config"]["clients"]:
+      client["batchwait"] = batch_wait
+      client["batchsize"] = batch_size
+    return values
+
+  return update_values
+
+def loki_caches(provider, namespace, chunk_cache: dict = {}, results_cache: dict = {}, depends_on: list = [])->list:
+  caches = []
+
+  if chunk_cache:
+    caches.append(charts.memcached(
+      name="loki-chunk-cache",
+      provider=provider,
+      namespace=namespace,
+      replicas=chunk_cache.get("replicas", 1),
+      memory_mb=chunk_cache.get("memory_mb", 2048),
+      max_item_size="2m",
+      depends_on=depends_on,
+    ))
+
+  if results_cache:
+    caches.append(charts.memcached(
+      name="loki-results-cache",
+      provider=provider,
+      namespace=namespace,
+      replicas=results_cache.get("replicas", 1),
+      memory_mb=results_cache.get("memory_mb", 512),
+      depends_on=depends_on,
+    ))
+
+  return caches
+
+def loki_storage_profile(retention_days: int = None, tiering_after_days: int = 7, tenant: str = "fake")->dict:
+  """
+  Bucket storage profile for the index and the chunks of a tenant ( `fake` when authentication is disabled ), matched to the compactor retention.
+  Objects expire 30 days after the retention, as a safety net behind the compactor: rewritten index tables are younger than the data they hold.
+  """
+  return {
+    "abort_multipart_days": 1,
+    "rules": [
+      {
+        "id": "chunks",
+        "prefix": f"{tenant}/",
+        "tiering_after_days": tiering_after_days,
+        "expiration_days": retention_days + 30 if retention_days else None,
+      },
+      {
+        "id": "index",
+        "prefix": "index/",
+        "expiration_days": retention_days + 30 if retention_days else None,
+      },
+    ],
+    "metrics": {
+      "EntireBucket": "",
+      "Chunks": f"{tenant}/",
+      "Index": "index/",
+    },
+  }
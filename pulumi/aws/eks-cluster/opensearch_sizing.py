@@ -0,0 +1,197 @@
+import hashlib
+import json
+import math
+
+"""
+OpenSearch sizing: node count, heap, storage and shards from the expected ingest, retention and query load
+"""
+
+# Target primary shard size for time-series indices
+SHARD_SIZE_GB = 30
+# Max shards per GB of heap
+SHARDS_PER_HEAP_GB = 20
+# Compressed object pointers are lost above ~32GB of heap
+MAX_HEAP_MB = 31744
+# On-disk overhead over the raw ingest, and free space kept under the disk watermarks
+INDEX_OVERHEAD = 1.1
+DISK_HEADROOM = 0.75
+# Max data per node by memory ( GB of disk per GB of memory ), keeps the heap able to serve the indices
+DISK_TO_MEMORY_RATIO = 48
+
+query_load_cpu = {
+  "low": 1000,
+  "medium": 2000,
+  "high": 4000,
+}
+
+query_load_min_nodes = {
+  "low": 1,
+  "medium": 3,
+  "high": 5,
+}
+
+def size(ingest_gb_per_day: float, retention_days: int, index_replicas: int = 1, query_load: str = "medium", memory_mb: int = 4096, merge_after_days: int = None)->dict:
+  daily_primary_gb = ingest_gb_per_day * INDEX_OVERHEAD
+  total_storage_gb = daily_primary_gb * retention_days * (1 + index_replicas) / DISK_HEADROOM
+
+  heap_mb = min(int(memory_mb * 0.5), MAX_HEAP_MB)
+  primary_shards = max(1, math.ceil(daily_primary_gb / SHARD_SIZE_GB))
+  total_shards = primary_shards * (1 + index_replicas) * retention_days
+
+  nodes = max(
+    query_load_min_nodes[query_load],
+    # Replicas need as many nodes to be allocated
+    index_replicas + 1,
+    math.ceil(total_storage_gb / (memory_mb / 1024 * DISK_TO_MEMORY_RATIO)),
+    math.ceil(total_shards / (heap_mb / 1024 * SHARDS_PER_HEAP_GB)),
+  )
+
+  return {
+    "nodes": nodes,
+    "memory_mb": memory_mb,
+    "heap_mb": heap_mb,
+    "cpu": f"{query_load_cpu[query_load]}m",
+    "storage_size": f"{max(10, math.ceil(total_storage_gb / nodes))}Gi",
+    "primary_shards": primary_shards,
+    "index_replicas": index_replicas,
+    # Less frequent refreshes for heavy ingest, fewer small segments to merge
+    "refresh_interval": "30s" if ingest_gb_per_day >= 50 else "10s",
+    "rollover_size": f"{SHARD_SIZE_GB * primary_shards}gb",
+    "retention_days": retention_days,
+    "merge_after_days": merge_after_days,
+  }
+
+def release_values(sizing: dict)->dict:
+  return {
+    "opensearchJavaOpts": f"-Xms{sizing['heap_mb']}m -Xmx{sizing['heap_mb']}m",
+  }
+
+def index_template(sizing: dict, index_prefix: str)->dict:
+  return {
+    "index_patterns": [f"{index_prefix}-*"],
+    "template": {
+      "settings": {
+        "number_of_shards": sizing["primary_shards"],
+        "number_of_replicas": sizing["index_replicas"],
+        "refresh_interval": sizing["refresh_interval"],
+        "plugins.index_state_management.rollover_alias": index_prefix,
+      },
+    },
+  }
+
+def ism_policy(sizing: dict, index_prefix: str)->dict:
+  states = [
+    {
+      "name": "hot",
+      "actions": [
+        { "rollover": { "min_size": sizing["rollover_size"], "min_index_age": "1d" } },
+      ],
+      "transitions": [],
+    },
+  ]
+
+  # Rolled over indices stay on the same nodes ( a single node group ), they only stop taking writes and are merged
+  if sizing["merge_after_days"]:
+    states[0]["transitions"].append({ "state_name": "merge", "conditions": { "min_index_age": f"{sizing['merge_after_days']}d" } })
+    states.append({
+      "name": "merge",
+      "actions": [
+        { "read_only": {} },
+        { "force_merge": { "max_num_segments": 1 } },
+      ],
+      "transitions": [],
+    })
+
+  states[-1]["transitions"].append({ "state_name": "delete", "conditions": { "min_index_age": f"{sizing['retention_days']}d" } })
+  states.append({
+    "name": "delete",
+    "actions": [
+      { "delete": {} },
+    ],
+    "transitions": [],
+  })
+
+  return {
+    "policy": {
+      "description": f"Rollover, merge and delete {index_prefix} indices",
+      "default_state": "hot",
+      "states": states,
+      "ism_template": [
+        { "index_patterns": [f"{index_prefix}-*"], "priority": 100 },
+      ],
+    },
+  }
+
+def bootstrap_manifests(sizing: dict, namespace: str, index_prefix: str = "logs", endpoint: str = "https://opensearch-cluster-master:9200", credentials_secret: str = "opensearch-admin")->list:
+  """
+  ConfigMap and Job applying the index template, the ISM policy and the first write index through the OpenSearch API.
+  The Job name includes the content hash, so a new Job runs when the sizing changes.
+  """
+  files = {
+    "index-template.json": json.dumps(index_template(sizing, index_prefix), indent=2, sort_keys=True),
+    "ism-policy.json": json.dumps(ism_policy(sizing, index_prefix), indent=2, sort_keys=True),
+    "write-index.json": json.dumps({ "aliases": { index_prefix: { "is_write_index": True } } }, indent=2),
+  }
+  content_hash = hashlib.sha256(json.dumps(files, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+  script = f"""set -e
+CURL="curl -sk -u $OPENSEARCH_USER:$OPENSEARCH_PASSWORD -H Content-Type:application/json"
+until $CURL -f {endpoint}/_cluster/health?wait_for_status=yellow; do sleep 10; done
+$CURL -f -X PUT {endpoint}/_index_template/{index_prefix} -d @/config/index-template.json
+# Existing policies need their sequence number to be updated
+POLICY=$($CURL {endpoint}/_plugins/_ism/policies/{index_prefix})
+SEQ_NO=$(echo "$POLICY" | sed -n 's/.*"_seq_no":\\([0-9]*\\).*/\\1/p')
+PRIMARY_TERM=$(echo "$POLICY" | sed -n 's/.*"_primary_term":\\([0-9]*\\).*/\\1/p')
+if [ -n "$SEQ_NO" ]; then
+  $CURL -f -X PUT "{endpoint}/_plugins/_ism/policies/{index_prefix}?if_seq_no=$SEQ_NO&if_primary_term=$PRIMARY_TERM" -d @/config/ism-policy.json
+else
+  $CURL -f -X PUT {endpoint}/_plugins/_ism/policies/{index_prefix} -d @/config/ism-policy.json
+fi
+$CURL -f -o /dev/null {endpoint}/_alias/{index_prefix} || $CURL -f -X PUT {endpoint}/{index_prefix}-000001 -d @/config/write-index.json
+"""
+
+  return [
+    {
+      "apiVersion": "v1",
+      "kind": "ConfigMap",
+      "metadata": {
+        "name": f"opensearch-bootstrap-{content_hash}",
+        "namespace": namespace,
+      },
+      "data": files,
+    },
+    {
+      "apiVersion": "batch/v1",
+      "kind": "Job",
+      "metadata": {
+        "name": f"opensearch-bootstrap-{content_hash}",
+        "namespace": namespace,
+      },
+      "spec": {
+        "backoffLimit": 10,
+        "ttlSecondsAfterFinished": 86400,
+        "template": {
+          "spec": {
+            "restartPolicy": "OnFailure",
+            "containers": [
+              {
+                "name": "bootstrap",
+                "image": "curlimages/curl:8.2.1",
+                "command": ["/bin/sh", "-c", script],
+                "env": [
+                  { "name": "OPENSEARCH_USER", "valueFrom": { "secretKeyRef": { "name": credentials_secret, "key": "username" } } },
+                  { "name": "OPENSEARCH_PASSWORD", "valueFrom": { "secretKeyRef": { "name": credentials_secret, "key": "password" } } },
+                ],
+                "volumeMounts": [
+                  { "name": "config", "mountPath": "/config" },
+                ],
+              },
+            ],
+            "volumes": [
+              { "name": "config", "configMap": { "name": f"opensearch-bootstrap-{content_hash}" } },
+            ],
+          },
+        },
+      },
+    },
+  ]
@@ -0,0 +1,155 @@
+import charts
+
+"""
+Prometheus sharding and Thanos caching values, merged into the `kube-prometheus-stack` and `thanos` releases
+"""
+
+# Remote-write queue defaults, sized for a shard scraping a few hundred thousand series
+remote_write_queue = {
+  "capacity": 10000,
+  "maxShards": 50,
+  "minShards": 1,
+  "maxSamplesPerSend": 2000,
+  "batchSendDeadline": "5s",
+  "minBackoff": "30ms",
+  "maxBackoff": "5s",
+}
+
+def query_address(shards: int = 1, thanos_enabled: bool = False, namespace: str = "prometheus")->str:
+  """
+  Prometheus API address of the complete series: each shard only holds its own targets, so sharded series are queried
+  through Thanos Query, merging the sidecars of every shard
+  """
+  if shards > 1:
+    if not thanos_enabled:
+      raise ValueError("Prometheus sharding needs Thanos ( `helm:thanos` ) to query the series of every shard")
+    # Service name is based on the fullnameOverride of the Thanos chart ( `name_override="thanos-stack"` )
+    return f"http://thanos-stack-query.{namespace}.svc:9090"
+  # Service name is based on the fullnameOverride of the Prometheus chart ( `name_override="prom-stack"` )
+  return f"http://prom-stack-prometheus.{namespace}.svc:9090"
+
+def prometheus_values(shards: int = 1, remote_write: dict = {})->dict:
+  """
+  Hashmod sharding of the scrape targets, each shard with its own Thanos sidecar
+  """
+  prometheus_spec = {
+    "shards": shards,
+  }
+
+  if remote_write.get("url"):
+    queue_config = dict(remote_write_queue)
+    queue_config.update(remote_write.get("queue", {}))
+    prometheus_spec["remoteWrite"] = [
+      {
+        "url": remote_write["url"],
+        "queueConfig": queue_config,
+      }
+    ]
+
+  return { "prometheus": { "prometheusSpec": prometheus_spec } }
+
+def _memcached_config(address: str, max_item_size: str = "1MiB")->str:
+  return f"""type: MEMCACHED
+config:
+  addresses:
+    - {address}
+  max_item_size: {max_item_size}
+  max_async_buffer_size: 10000
+  max_get_multi_batch_size: 100
+  timeout: 500ms
+  max_idle_connections: 100
+"""
+
+def thanos_values(namespace: str, query_cache: dict = {}, store_cache: dict = {})->dict:
+  """
+  Query frontend results cache with query splitting, and store gateway index and chunk caches
+  """
+  values = {}
+
+  if query_cache:
+    values["queryFrontend"] = {
+      "enabled": True,
+      "config": _memcached_config(
+        charts.memcached_address("thanos-query-cache", namespace),
+      ),
+      "extraFlags": [
+        f"--query-range.split-interval={query_cache.get('split_interval', '24h')}",
+        f"--query-range.max-retries-per-request={query_cache.get('max_retries', 3)}",
+        "--query-frontend.log-queries-longer-than=10s",
+        "--query-range.align-range-with-step",
+      ],
+    }
+
+  if store_cache:
+    values["indexCacheConfig"] = _memcached_config(
+      charts.memcached_address("thanos-index-cache", namespace),
+    )
+    values["bucketCacheConfig"] = _memcached_config(
+      charts.memcached_address("thanos-chunk-cache", namespace),
+    )
+
+  return values
+
+def thanos_caches(provider, namespace: str, query_cache: dict = {}, store_cache: dict = {}, depends_on: list = [])->list:
+  """
+  Memcached releases backing the Thanos caches
+  """
+  caches = []
+
+  if query_cache:
+    caches.append(charts.memcached(
+      name="thanos-query-cache",
+      provider=provider,
+      namespace=namespace,
+      replicas=query_cache.get("replicas", 1),
+      memory_mb=query_cache.get("memory_mb", 1024),
+      depends_on=depends_on,
+    ))
+
+  if store_cache:
+    caches.append(charts.memcached(
+      name="thanos-index-cache",
+      provider=provider,
+      namespace=namespace,
+      replicas=store_cache.get("replicas", 1),
+      memory_mb=store_cache.get("index_memory_mb", 1024),
+      depends_on=depends_on,
+    ))
+    caches.append(charts.memcached(
+      name="thanos-chunk-cache",
+      provider=provider,
+      namespace=namespace,
+      replicas=store_cache.get("replicas", 1),
+      memory_mb=store_cache.get("chunk_memory_mb", 2048),
+      depends_on=depends_on,
+    ))
+
+  return caches
+
+def _retention_days(retention: str)->int:
+  units = { "h": 1 / 24, "d": 1, "w": 7, "y": 365 }
+  return int(float(retention[:-1]) * units[retention[-1]])
+
+def thanos_storage_profile(retention_raw: str, retention_5m: str, retention_1h: str, tiering_after_days: int = 14)->dict:
+  """
+  Bucket storage profile matched to the compactor retentions.
+  Blocks move to Intelligent-Tiering once compacted, and expire after the longest retention, as a safety net behind the compactor.
+  """
+  max_retention_days = max(_retention_days(r) for r in [retention_raw, retention_5m, retention_1h])
+
+  return {
+    "abort_multipart_days": 1,
+    "rules": [
+      {
+        "id": "blocks",
+        "prefix": "",
+        "tiering_after_days": tiering_after_days,
+        # Downsampled blocks are written after the data they hold, so the object age stays behind the compactor retention
+        "expiration_days": max_retention_days + 30,
+      },
+    ],
+    # Block prefixes are ULIDs, only the entire bucket can be filtered
+    "metrics": {
+      "EntireBucket": "",
+    },
+  }
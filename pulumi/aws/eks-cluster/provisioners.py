@@ -0,0 +1,109 @@
+"""
+Karpenter Provisioner generator: compact workload classes into Graviton-first, spot-diversified provisioners
+"""
+
+# Instance categories by memory (GiB) per vCPU: compute, general purpose and memory optimized families
+categories_by_memory_ratio = {
+  2: ["c", "m"],
+  4: ["m", "c", "r"],
+  8: ["r", "m"],
+}
+
+workload_classes = {
+  "nginx": {
+    "labels": { "app": "nginx" },
+    "node_template": "bottlerocket",
+    "memory_ratio": 2,
+    "cpu": [2, 4, 8],
+    # Architectures in order of preference, each one gets its own weighted provisioner
+    "arch": ["arm64", "amd64"],
+    "capacity_types": ["spot", "on-demand"],
+    "consolidation": True,
+    "ttl_seconds_until_expired": 604800,
+    # vCPUs of the whole class, split across its architecture provisioners
+    "cpu_limit": 100,
+  },
+}
+
+def _requirement(key: str, operator: str, values: list)->dict:
+  return {
+    "key": key,
+    "operator": operator,
+    "values": [ str(v) for v in values ],
+  }
+
+def provisioner(name: str, workload_class: dict, arch: str, weight: int, cpu_limit: int = None, kubelet_configuration: dict = {}, startup_taints: list = [])->dict:
+  labels = { "karpenter": "enabled" }
+  labels.update(workload_class.get("labels", {}))
+
+  spec = {
+    "weight": weight,
+    "labels": labels,
+    "taints": workload_class.get("taints", []),
+    "providerRef": {
+      "name": workload_class.get("node_template", "default"),
+    },
+    "requirements": [
+      _requirement("karpenter.k8s.aws/instance-category", "In", workload_class.get("categories", categories_by_memory_ratio[workload_class.get("memory_ratio", 4)])),
+      _requirement("karpenter.k8s.aws/instance-generation", "Gt", [workload_class.get("min_generation", 4)]),
+      _requirement("karpenter.k8s.aws/instance-cpu", "In", workload_class.get("cpu", [2, 4, 8])),
+      _requirement("kubernetes.io/arch", "In", [arch]),
+      _requirement("kubernetes.io/os", "In", ["linux"]),
+      _requirement("karpenter.sh/capacity-type", "In", workload_class.get("capacity_types", ["spot", "on-demand"])),
+    ],
+  }
+
+  if startup_taints:
+    spec["startupTaints"] = startup_taints
+
+  if kubelet_configuration:
+    spec["kubeletConfiguration"] = kubelet_configuration
+
+  # Consolidation and `ttlSecondsAfterEmpty` are mutually exclusive
+  if workload_class.get("consolidation", True):
+    spec["consolidation"] = { "enabled": True }
+  else:
+    spec["ttlSecondsAfterEmpty"] = workload_class.get("ttl_seconds_after_empty", 30)
+
+  if "ttl_seconds_until_expired" in workload_class:
+    spec["ttlSecondsUntilExpired"] = workload_class["ttl_seconds_until_expired"]
+
+  if cpu_limit is not None:
+    spec["limits"] = { "resources": { "cpu": cpu_limit } }
+
+  return {
+    "apiVersion": "karpenter.sh/v1alpha5",
+    "kind": "Provisioner",
+    "metadata": {
+      "name": name,
+      "labels": workload_class.get("labels", {}),
+    },
+    "spec": spec,
+  }
+
+def split_cpu_limit(cpu_limit: int, count: int, idx: int)->int:
+  """
+  Share of the class vCPU limit for the provisioner at `idx`, the preferred architectures getting the remainder
+  """
+  return cpu_limit // count + (1 if idx < cpu_limit % count else 0)
+
+def generate_provisioners(classes: dict = workload_classes, kubelet_configuration: dict = {}, startup_taints: list = [])->list:
+  """
+  Render one provisioner per workload class and architecture, the preferred architecture getting the highest weight
+  """
+  provisioners = []
+  for class_name, workload_class in classes.items():
+    archs = workload_class.get("arch", ["arm64", "amd64"])
+    for idx, arch in enumerate(archs):
+      provisioners.append(
+        provisioner(
+          name=f"{class_name}-{arch}",
+          workload_class=workload_class,
+          arch=arch,
+          weight=10 * (len(archs) - idx),
+          cpu_limit=split_cpu_limit(workload_class["cpu_limit"], len(archs), idx) if "cpu_limit" in workload_class else None,
+          kubelet_configuration=kubelet_configuration,
+          startup_taints=startup_taints,
+        )
+      )
+  return provisioners
@@ -0,0 +1,127 @@
+import time
+import pulumi
+from pulumi.dynamic import ResourceProvider, CreateResult, DiffResult, UpdateResult, Resource
+
+"""
+Readiness gates: dynamic resources created once a condition holds in the cluster ( webhook endpoints ready,
+CRD established, deployment available ), so dependent releases wait for that condition instead of a whole release
+"""
+
+def endpoints_ready(obj: dict)->bool:
+  return any(subset.get("addresses") for subset in obj.get("subsets") or [])
+
+def crd_established(obj: dict)->bool:
+  return any(c.get("type") == "Established" and c.get("status") == "True" for c in obj.get("status", {}).get("conditions") or [])
+
+def deployment_available(obj: dict)->bool:
+  status = obj.get("status", {})
+  replicas = obj.get("spec", {}).get("replicas", 1)
+  available = any(c.get("type") == "Available" and c.get("status") == "True" for c in status.get("conditions") or [])
+  return available and status.get("updatedReplicas", 0) >= replicas and status.get("availableReplicas", 0) >= replicas
+
+checks = {
+  "Endpoints": endpoints_ready,
+  "CustomResourceDefinition": crd_established,
+  "Deployment": deployment_available,
+}
+
+class KubernetesApi:
+  """
+  Reads objects as dicts through the Kubernetes client, any object with the same `get` method can replace it ( e.g. a fake API in tests )
+  """
+  def __init__(self, kubeconfig: str):
+    import yaml
+    from kubernetes import config, client
+
+    self.client = config.new_client_from_config_dict(yaml.safe_load(kubeconfig))
+    self.readers = {
+      "Endpoints": lambda namespace, name: client.CoreV1Api(self.client).read_namespaced_endpoints(name, namespace),
+      "CustomResourceDefinition": lambda namespace, name: client.ApiextensionsV1Api(self.client).read_custom_resource_definition(name),
+      "Deployment": lambda namespace, name: client.AppsV1Api(self.client).read_namespaced_deployment(name, namespace),
+    }
+
+  def get(self, kind: str, namespace: str, name: str)->dict:
+    from kubernetes.client.exceptions import ApiException
+
+    try:
+      return self.client.sanitize_for_serialization(self.readers[kind](namespace, name))
+    except ApiException as e:
+      if e.status == 404:
+        return None
+      raise
+
+def wait(api, kind: str, namespace: str, name: str, timeout: int = 300, interval: int = 5, clock = time)->bool:
+  """
+  Poll the object until its check holds, missing objects are retried until the timeout
+  """
+  if kind not in checks:
+    raise ValueError(f"Unsupported readiness kind '{kind}', expected one of: {', '.join(checks.keys())}")
+
+  deadline = clock.monotonic() + timeout
+  while True:
+    obj = api.get(kind, namespace, name)
+    if obj and checks[kind](obj):
+      return True
+    if clock.monotonic() >= deadline:
+      raise TimeoutError(f"{kind} {namespace + '/' if namespace else ''}{name} not ready after {timeout}s")
+    clock.sleep(interval)
+
+class ReadinessProvider(ResourceProvider):
+
+  def create(self, props):
+    wait(KubernetesApi(props["kubeconfig"]), props["kind"], props.get("namespace"), props["name"], props["timeout"], props["interval"])
+    return CreateResult(id_=f"{props['kind']}/{props.get('namespace') or ''}/{props['name']}", outs={ **props, "ready": True })
+
+  def diff(self, _id, olds, news):
+    keys = ["kind", "namespace", "name", "triggers"]
+    changes = [ k for k in keys if olds.get(k) != news.get(k) ]
+    return DiffResult(changes=bool(changes), replaces=[ k for k in changes if k != "triggers" ], delete_before_replace=True)
+
+  def update(self, _id, olds, news):
+    # Triggers changed ( e.g. a new release revision ), the condition is checked again
+    wait(KubernetesApi(news["kubeconfig"]), news["kind"], news.get("namespace"), news["name"], news["timeout"], news["interval"])
+    return UpdateResult(outs={ **news, "ready": True })
+
+class Readiness(Resource):
+  """
+  Gate resolved when the condition holds, `triggers` force a new check when they change
+  """
+  ready: pulumi.Output[bool]
+
+  def __init__(self, resource_name: str, kind: str, name: pulumi.Input[str], kubeconfig: pulumi.Input[str], namespace: pulumi.Input[str] = None, triggers: list = [], timeout: int = 300, interval: int = 5, depends_on: list = []):
+    super().__init__(
+      ReadinessProvider(),
+      resource_name,
+      {
+        "kind": kind,
+        "namespace": namespace,
+        "name": name,
+        "kubeconfig": pulumi.Output.secret(kubeconfig),
+        "triggers": triggers,
+        "timeout": timeout,
+        "interval": interval,
+        "ready": None,
+      },
+      pulumi.ResourceOptions(depends_on=depends_on),
+    )
+
+def webhook_ready(resource_name: str, service: pulumi.Input[str], namespace: pulumi.Input[str], kubeconfig: pulumi.Input[str], release = None, timeout: int = 300)->Readiness:
+  """
+  Webhook service with ready endpoints, checked again on every new revision of the release serving it
+  """
+  return Readiness(
+    resource_name,
+    kind="Endpoints",
+    name=service,
+    namespace=namespace,
+    kubeconfig=kubeconfig,
+    triggers=[release.status.revision] if release else [],
+    timeout=timeout,
+    depends_on=[release] if release else [],
+  )
+
+def crd_ready(resource_name: str, crd: str, kubeconfig: pulumi.Input[str], depends_on: list = [], timeout: int = 300)->Readiness:
+  return Readiness(resource_name, kind="CustomResourceDefinition", name=crd, kubeconfig=kubeconfig, timeout=timeout, depends_on=depends_on)
+
+def deployment_ready(resource_name: str, deployment: pulumi.Input[str], namespace: pulumi.Input[str], kubeconfig: pulumi.Input[str], depends_on: list = [], timeout: int = 300)->Readiness:
+  return Readiness(resource_name, kind="Deployment", name=deployment, namespace=namespace, kubeconfig=kubeconfig, timeout=timeout, depends_on=depends_on)
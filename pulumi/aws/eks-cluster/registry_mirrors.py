@@ -0,0 +1,90 @@
+"""
+Registry mirrors on the AL2 nodes, pointing the public registries to the ECR pull-through caches ( `lambda/ecr-repo-autoprovision` ).
+Containerd falls back to the upstream registry when a mirror pull fails.
+Bottlerocket nodes are left out: their mirrors only take static credentials, and ECR tokens expire after 12 hours
+"""
+
+# Image registry and the ECR repository prefix of its pull-through cache rule, overridden from `aws-eks-cluster:registry_mirrors`.
+# Only the registries whose rule is always created: a mirror without rule fails every pull before the upstream fallback
+pull_through_prefixes = {
+  "quay.io": "quay",
+  "registry.k8s.io": "registry-k8s-io",
+}
+
+# Prefixes of the rules created only with a `credential_arn`, mirrored when the registry is set in the config ( `"docker.io": true` )
+credential_prefixes = {
+  "docker.io": "docker-hub",
+  "ghcr.io": "ghcr",
+}
+
+def get_mirrors(overrides: dict = {})->dict:
+  overrides = { registry: credential_prefixes.get(registry) if prefix is True else prefix for registry, prefix in overrides.items() }
+  return { registry: prefix for registry, prefix in { **pull_through_prefixes, **overrides }.items() if prefix }
+
+def ecr_registry(account_id: str, region: str)->str:
+  return f"{account_id}.dkr.ecr.{region}.amazonaws.com"
+
+def endpoint(registry: str, prefix: str)->str:
+  # Pull-through repositories are named `<prefix>/<upstream repository>`, the mirror endpoint carries the prefix in its path
+  return f"https://{registry}/v2/{prefix}"
+
+def al2_script(mirrors: dict, registry: str, region: str)->str:
+  """
+  AL2 user data: containerd hosts configuration for each mirror, with the ECR credentials refreshed by a systemd timer
+  ( ECR tokens expire after 12 hours ). Runs before the EKS bootstrap script, which renders the containerd config template
+  """
+  if not mirrors:
+    return ""
+
+  lines = [
+    "CONTAINERD_TEMPLATE=/etc/eks/containerd/containerd-config.toml",
+    "REGISTRY_TABLE='[plugins.\"io.containerd.grpc.v1.cri\".registry]'",
+    "if ! grep -q 'config_path' $CONTAINERD_TEMPLATE; then",
+    "  if grep -qF \"$REGISTRY_TABLE\" $CONTAINERD_TEMPLATE; then",
+    "    sed -i '/^\\[plugins.\"io.containerd.grpc.v1.cri\".registry\\]/a config_path = \"/etc/containerd/certs.d\"' $CONTAINERD_TEMPLATE",
+    "  else",
+    "    printf '\\n%s\\nconfig_path = \"/etc/containerd/certs.d\"\\n' \"$REGISTRY_TABLE\" >> $CONTAINERD_TEMPLATE",
+    "  fi",
+    "fi",
+    "cat <<'EOF' > /usr/local/bin/ecr-mirrors-auth",
+    "#!/bin/bash",
+    "set -eu",
+    f"AUTH=$(echo -n \"AWS:$(aws ecr get-login-password --region {region})\" | base64 -w0)",
+  ]
+  for upstream, prefix in mirrors.items():
+    lines += [
+      f"mkdir -p /etc/containerd/certs.d/{upstream}",
+      f"cat <<HOSTS > /etc/containerd/certs.d/{upstream}/hosts.toml.tmp",
+      f"[host.\"{endpoint(registry, prefix)}\"]",
+      "  capabilities = [\"pull\", \"resolve\"]",
+      "  override_path = true",
+      f"  [host.\"{endpoint(registry, prefix)}\".header]",
+      "    authorization = \"Basic ${AUTH}\"",
+      "HOSTS",
+      f"mv /etc/containerd/certs.d/{upstream}/hosts.toml.tmp /etc/containerd/certs.d/{upstream}/hosts.toml",
+    ]
+  lines += [
+    "EOF",
+    "chmod 0755 /usr/local/bin/ecr-mirrors-auth",
+    "cat <<'EOF' > /etc/systemd/system/ecr-mirrors-auth.service",
+    "[Unit]",
+    "Description=Refresh the ECR credentials of the registry mirrors",
+    "[Service]",
+    "Type=oneshot",
+    "ExecStart=/usr/local/bin/ecr-mirrors-auth",
+    "EOF",
+    "cat <<'EOF' > /etc/systemd/system/ecr-mirrors-auth.timer",
+    "[Unit]",
+    "Description=Refresh the ECR credentials of the registry mirrors",
+    "[Timer]",
+    "OnBootSec=0",
+    "OnUnitActiveSec=6h",
+    "[Install]",
+    "WantedBy=timers.target",
+    "EOF",
+    "/usr/local/bin/ecr-mirrors-auth || true",
+    "systemctl daemon-reload",
+    "systemctl enable --now ecr-mirrors-auth.timer",
+  ]
+
+  return "\n".join(lines)
@@ -1,7 +1,7 @@
 import pulumi
 from pulumi_aws import s3
 
-def bucket_with_allowed_roles(name: str, acl: str = "private", force_destroy: bool = False, roles: list = []) -> s3.Bucket:
+def bucket_with_allowed_roles(name: str, acl: str = "private", force_destroy: bool = False, roles: list = [], storage_profile: dict = {}) -> s3.Bucket:
   bucket = s3.Bucket(
     resource_name=name,
     bucket=name,
@@ -64,8 +64,66 @@ def bucket_with_allowed_roles(name: str, acl: str = "private", force_destroy: bo
     )
   )
 
+  if storage_profile:
+    bucket_storage(name=name, bucket=bucket, profile=storage_profile)
+
   return bucket
 
+def bucket_storage(name: str, bucket: s3.Bucket, profile: dict):
+  """
+  Lifecycle rules and request metrics of a bucket, from a storage profile:
+    abort_multipart_days: days before incomplete multipart uploads are removed
+    rules: list of { id, prefix, tiering_after_days, expiration_days }, objects move to Intelligent-Tiering and expire by prefix
+    metrics: request metrics filters, { name: prefix }, an empty prefix covering the entire bucket
+  """
+  rules = [
+    {
+      "id": "abort-incomplete-multipart",
+      "status": "Enabled",
+      "filter": {},
+      "abort_incomplete_multipart_upload": {
+        "days_after_initiation": profile.get("abort_multipart_days", 1),
+      },
+    }
+  ]
+
+  for rule in profile.get("rules", []):
+    lifecycle_rule = {
+      "id": rule["id"],
+      "status": "Enabled",
+      "filter": {
+        "prefix": rule.get("prefix", ""),
+      },
+    }
+    if rule.get("tiering_after_days") is not None:
+      lifecycle_rule["transitions"] = [
+        {
+          "days": rule["tiering_after_days"],
+          "storage_class": "INTELLIGENT_TIERING",
+        }
+      ]
+    if rule.get("expiration_days"):
+      lifecycle_rule["expiration"] = {
+        "days": rule["expiration_days"],
+      }
+    # Rules need at least one action
+    if "transitions" in lifecycle_rule or "expiration" in lifecycle_rule:
+      rules.append(lifecycle_rule)
+
+  s3.BucketLifecycleConfigurationV2(
+    resource_name=name,
+    bucket=bucket.id,
+    rules=rules,
+  )
+
+  for metric_name, prefix in profile.get("metrics", {}).items():
+    s3.BucketMetric(
+      resource_name=f"{name}-{metric_name}",
+      bucket=bucket.id,
+      name=metric_name,
+      filter={ "prefix": prefix } if prefix else None,
+    )
+
 def elb_logs_bucket(name: str, acl: str = "private", force_destroy: bool = False) -> s3.Bucket:
   lb_logs_bucket = s3.Bucket(
     name,
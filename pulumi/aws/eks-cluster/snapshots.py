@@ -0,0 +1,197 @@
+"""
+Volume snapshots of a synced StatefulSet volume ( bitcoin-node chainstate ): scheduled EBS snapshots through the CSI snapshot controller,
+and new claims restored from the latest one instead of starting empty
+"""
+
+SNAPSHOT_CLASS = "ebs-snapshots"
+
+def snapshot_class(cluster_name: str)->dict:
+  return {
+    "apiVersion": "snapshot.storage.k8s.io/v1",
+    "kind": "VolumeSnapshotClass",
+    "metadata": {
+      "name": SNAPSHOT_CLASS,
+    },
+    "driver": "ebs.csi.aws.com",
+    "deletionPolicy": "Delete",
+    "parameters": {
+      "tagSpecification_1": f"eks-cluster-name={cluster_name}",
+    },
+  }
+
+def latest_snapshot_name(claim: str)->str:
+  return f"{claim}-latest"
+
+# Snapshot the claim, point `<claim>-latest` to it ( static VolumeSnapshot retaining the EBS snapshot ), and keep the last `KEEP` snapshots.
+# The new and previous EBS snapshot IDs are left in `/work` for the fast snapshot restore step
+snapshot_script = """
+set -eu
+name="${CLAIM}-$(date +%Y%m%d%H%M%S)"
+
+kubectl apply -f - <<EOF
+apiVersion: snapshot.storage.k8s.io/v1
+kind: VolumeSnapshot
+metadata:
+  name: ${name}
+  namespace: ${NAMESPACE}
+  labels:
+    volume-snapshot-claim: ${CLAIM}
+spec:
+  volumeSnapshotClassName: ${SNAPSHOT_CLASS}
+  source:
+    persistentVolumeClaimName: ${CLAIM}
+EOF
+kubectl wait -n "${NAMESPACE}" "volumesnapshot/${name}" --for=jsonpath='{.status.readyToUse}'=true --timeout="${TIMEOUT}"
+
+content=$(kubectl get -n "${NAMESPACE}" "volumesnapshot/${name}" -o jsonpath='{.status.boundVolumeSnapshotContentName}')
+handle=$(kubectl get "volumesnapshotcontent/${content}" -o jsonpath='{.status.snapshotHandle}')
+
+previous=$(kubectl get "volumesnapshotcontent/${NAMESPACE}-${CLAIM}-latest" -o jsonpath='{.spec.source.snapshotHandle}' --ignore-not-found)
+if [ -d /work ]; then
+  echo "${handle}" > /work/snapshot-id
+  echo "${previous}" > /work/previous-snapshot-id
+fi
+
+kubectl delete -n "${NAMESPACE}" "volumesnapshot/${CLAIM}-latest" --ignore-not-found --wait
+kubectl delete "volumesnapshotcontent/${NAMESPACE}-${CLAIM}-latest" --ignore-not-found --wait
+kubectl apply -f - <<EOF
+apiVersion: snapshot.storage.k8s.io/v1
+kind: VolumeSnapshotContent
+metadata:
+  name: ${NAMESPACE}-${CLAIM}-latest
+spec:
+  deletionPolicy: Retain
+  driver: ebs.csi.aws.com
+  source:
+    snapshotHandle: ${handle}
+  volumeSnapshotRef:
+    name: ${CLAIM}-latest
+    namespace: ${NAMESPACE}
+---
+apiVersion: snapshot.storage.k8s.io/v1
+kind: VolumeSnapshot
+metadata:
+  name: ${CLAIM}-latest
+  namespace: ${NAMESPACE}
+spec:
+  source:
+    volumeSnapshotContentName: ${NAMESPACE}-${CLAIM}-latest
+EOF
+
+kubectl get -n "${NAMESPACE}" volumesnapshot -l "volume-snapshot-claim=${CLAIM}" --sort-by=.metadata.creationTimestamp -o name \\
+  | head -n "-${KEEP}" | xargs -r kubectl delete -n "${NAMESPACE}"
+"""
+
+# Fast snapshot restore on the new snapshot in the given AZs, disabled on the previous one ( FSR is billed per snapshot and AZ )
+fast_snapshot_restore_script = """
+set -eu
+snapshot=$(cat /work/snapshot-id)
+previous=$(cat /work/previous-snapshot-id)
+
+aws ec2 enable-fast-snapshot-restores --availability-zones ${AZS} --source-snapshot-ids "${snapshot}"
+if [ -n "${previous}" ] && [ "${previous}" != "${snapshot}" ]; then
+  aws ec2 disable-fast-snapshot-restores --availability-zones ${AZS} --source-snapshot-ids "${previous}"
+fi
+"""
+
+def snapshot_schedule(name: str, namespace: str, claim: str, schedule: str, service_account: str, keep: int = 3, timeout: str = "6h", fast_snapshot_restore_azs: list = [], region: str = None, image: str = "bitnami/kubectl:1.27", aws_cli_image: str = "amazon/aws-cli:2.13.25")->list:
+  """
+  CronJob and RBAC taking the scheduled snapshots of a claim.
+  With fast snapshot restore AZs, the service account needs an IAM role allowing `ec2:*FastSnapshotRestores`
+  """
+  labels = { "app": name }
+  snapshot_container = {
+    "name": "snapshot",
+    "image": image,
+    "command": ["/bin/bash", "-c", snapshot_script],
+    "env": [
+      { "name": "NAMESPACE", "value": namespace },
+      { "name": "CLAIM", "value": claim },
+      { "name": "SNAPSHOT_CLASS", "value": SNAPSHOT_CLASS },
+      { "name": "KEEP", "value": str(keep) },
+      { "name": "TIMEOUT", "value": timeout },
+    ],
+    "resources": {
+      "requests": { "cpu": "10m", "memory": "32Mi" },
+    },
+  }
+
+  pod_spec = {
+    "serviceAccountName": service_account,
+    "restartPolicy": "Never",
+    "containers": [snapshot_container],
+  }
+  if fast_snapshot_restore_azs:
+    # The snapshot runs first, then FSR is switched to the new snapshot
+    snapshot_container["volumeMounts"] = [ { "name": "work", "mountPath": "/work" } ]
+    pod_spec["initContainers"] = [snapshot_container]
+    pod_spec["containers"] = [
+      {
+        "name": "fast-snapshot-restore",
+        "image": aws_cli_image,
+        "command": ["/bin/bash", "-c", fast_snapshot_restore_script],
+        "env": [
+          { "name": "AZS", "value": " ".join(fast_snapshot_restore_azs) },
+          { "name": "AWS_REGION", "value": region },
+        ],
+        "volumeMounts": [ { "name": "work", "mountPath": "/work" } ],
+        "resources": {
+          "requests": { "cpu": "10m", "memory": "64Mi" },
+        },
+      },
+    ]
+    pod_spec["volumes"] = [ { "name": "work", "emptyDir": {} } ]
+
+  return [
+    {
+      "apiVersion": "rbac.authorization.k8s.io/v1",
+      "kind": "ClusterRole",
+      "metadata": { "name": f"{namespace}-{name}", "labels": labels },
+      "rules": [
+        {
+          "apiGroups": ["snapshot.storage.k8s.io"],
+          "resources": ["volumesnapshots", "volumesnapshotcontents"],
+          "verbs": ["get", "list", "watch", "create", "patch", "delete"],
+        },
+      ],
+    },
+    {
+      "apiVersion": "rbac.authorization.k8s.io/v1",
+      "kind": "ClusterRoleBinding",
+      "metadata": { "name": f"{namespace}-{name}", "labels": labels },
+      "roleRef": { "apiGroup": "rbac.authorization.k8s.io", "kind": "ClusterRole", "name": f"{namespace}-{name}" },
+      "subjects": [ { "kind": "ServiceAccount", "name": service_account, "namespace": namespace } ],
+    },
+    {
+      "apiVersion": "batch/v1",
+      "kind": "CronJob",
+      "metadata": { "name": name, "namespace": namespace, "labels": labels },
+      "spec": {
+        "schedule": schedule,
+        "concurrencyPolicy": "Forbid",
+        "successfulJobsHistoryLimit": 1,
+        "failedJobsHistoryLimit": 3,
+        "jobTemplate": {
+          "spec": {
+            "backoffLimit": 1,
+            "template": {
+              "metadata": { "labels": labels },
+              "spec": pod_spec,
+            },
+          },
+        },
+      },
+    },
+  ]
+
+def restore_claim_templates(obj: dict, claim_template: str):
+  """
+  Manifest transformation: claims of a StatefulSet template restored from the latest snapshot of its first replica
+  """
+  for claim in obj["spec"].get("volumeClaimTemplates", []):
+    if claim["metadata"]["name"] == claim_template:
+      claim["spec"]["dataSourceRef"] = {
+        "apiGroup": "snapshot.storage.k8s.io",
+        "kind": "VolumeSnapshot",
+        "name": latest_snapshot_name(f"{claim_template}-{obj['metadata']['name']}-0"),
+      }
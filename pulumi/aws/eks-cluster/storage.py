@@ -0,0 +1,140 @@
+import userdata
+
+"""
+StorageClass tiers: EBS gp3 with provisioned IOPS/throughput, io2, and instance-store NVMe through the local volume provisioner
+"""
+
+# `ebs` is created by the EBS CSI driver release as the default class, with the gp3 baseline ( 3000 IOPS / 125 MB/s )
+DEFAULT_CLASS = "ebs"
+
+# Tiers overridden or added from the `storage:classes` config object, a tier set to null is not created
+storage_classes = {
+  "gp3-throughput": {
+    "type": "gp3",
+    "iops": 6000,
+    "throughput": 500,
+  },
+  "io2": {
+    "type": "io2",
+    "iops_per_gb": 50,
+  },
+  "local-nvme": {
+    "type": "local",
+  },
+}
+
+# Tier used by each chart and manifest, overridden from the `storage:tiers` config object
+consumer_tiers = {
+  "prometheus": DEFAULT_CLASS,
+  "thanos": DEFAULT_CLASS,
+  "loki": DEFAULT_CLASS,
+  "opensearch": DEFAULT_CLASS,
+  # Initial block download is bound by the volume throughput
+  "bitcoin-node": "gp3-throughput",
+}
+
+# Instance-store devices of Nitro instances, formatted and mounted by the local volume provisioner
+local_nvme_name_pattern = "nvme-Amazon_EC2_NVMe_Instance_Storage*"
+local_nvme_node_label = "karpenter.k8s.aws/instance-local-nvme"
+
+def get_classes(overrides: dict = {})->dict:
+  return { name: tier for name, tier in userdata.deep_merge(storage_classes, overrides).items() if tier }
+
+def class_name(consumer: str, classes: dict, tiers: dict = {})->str:
+  """
+  StorageClass picked by a chart or manifest
+  """
+  tier = { **consumer_tiers, **tiers }.get(consumer, DEFAULT_CLASS)
+  if tier != DEFAULT_CLASS and tier not in classes:
+    raise ValueError(f"Unknown storage tier '{tier}' for '{consumer}', expected one of: {', '.join([DEFAULT_CLASS] + list(classes.keys()))}")
+  return tier
+
+def set_claims_class(obj: dict, class_name: str):
+  """
+  Manifest transformation: StorageClass of a PersistentVolumeClaim or of the claim templates of a StatefulSet
+  """
+  if obj["kind"] == "PersistentVolumeClaim":
+    obj["spec"]["storageClassName"] = class_name
+  elif obj["kind"] == "StatefulSet":
+    for claim in obj["spec"].get("volumeClaimTemplates", []):
+      claim["spec"]["storageClassName"] = class_name
+
+def local_classes(classes: dict)->dict:
+  return { name: tier for name, tier in classes.items() if tier["type"] == "local" }
+
+def _ebs_parameters(name: str, tier: dict)->dict:
+  parameters = {
+    "type": tier["type"],
+    "encrypted": "true",
+    "csi.storage.k8s.io/fstype": tier.get("fs_type", "ext4"),
+  }
+
+  if tier["type"] == "gp3":
+    iops = tier.get("iops", 3000)
+    throughput = tier.get("throughput", 125)
+    if not 3000 <= iops <= 16000 or not 125 <= throughput <= 1000:
+      raise ValueError(f"Storage tier '{name}': gp3 supports 3000-16000 IOPS and 125-1000 MB/s")
+    # gp3 throughput is limited to 0.25 MB/s per provisioned IOPS
+    if throughput > iops / 4:
+      raise ValueError(f"Storage tier '{name}': {throughput} MB/s needs at least {throughput * 4} IOPS")
+    parameters["iops"] = str(iops)
+    parameters["throughput"] = str(throughput)
+  elif tier["type"] in ["io1", "io2"]:
+    parameters["iopsPerGB"] = str(tier["iops_per_gb"])
+    parameters["allowAutoIOPSPerGBIncrease"] = "true"
+  else:
+    raise ValueError(f"Storage tier '{name}': unsupported type '{tier['type']}', expected one of: gp3, io1, io2, local")
+
+  return parameters
+
+def storage_class(name: str, tier: dict)->dict:
+  obj = {
+    "apiVersion": "storage.k8s.io/v1",
+    "kind": "StorageClass",
+    "metadata": {
+      "name": name,
+    },
+    # Volumes are created in the zone of the pod, and local volumes on its node
+    "volumeBindingMode": "WaitForFirstConsumer",
+    "reclaimPolicy": tier.get("reclaim_policy", "Delete"),
+  }
+
+  if tier["type"] == "local":
+    obj["provisioner"] = "kubernetes.io/no-provisioner"
+  else:
+    obj["provisioner"] = "ebs.csi.aws.com"
+    obj["allowVolumeExpansion"] = True
+    obj["parameters"] = _ebs_parameters(name, tier)
+
+  return obj
+
+def generate_storage_classes(classes: dict, ebs_enabled: bool = True)->list:
+  return [ storage_class(name, tier) for name, tier in classes.items() if ebs_enabled or tier["type"] == "local" ]
+
+def local_provisioner_values(classes: dict)->dict:
+  """
+  Local volume provisioner values: instance-store devices are formatted and published as PVs of each local class
+  """
+  return {
+    "classes": [
+      {
+        "name": name,
+        "hostDir": "/dev/disk/by-id",
+        "mountDir": "/dev/disk/by-id",
+        "namePattern": tier.get("name_pattern", local_nvme_name_pattern),
+        "volumeMode": "Filesystem",
+        "fsType": tier.get("fs_type", "ext4"),
+        "blockCleanerCommand": ["/scripts/quick_reset.sh"],
+        "storageClass": False,
+      } for name, tier in classes.items()
+    ],
+    "affinity": {
+      "nodeAffinity": {
+        "requiredDuringSchedulingIgnoredDuringExecution": {
+          "nodeSelectorTerms": [
+            { "matchExpressions": [ { "key": local_nvme_node_label, "operator": "Exists" } ] },
+          ],
+        },
+      },
+    },
+  }
@@ -6,6 +6,7 @@ import hashlib
 import requests
 import netaddr
 import yaml
+import userdata
 
 def ignore_changes(args: pulumi.ResourceTransformationArgs):
   
@@ -46,6 +47,25 @@ def ignore_changes(args: pulumi.ResourceTransformationArgs):
                 ignore_changes=secret['properties'],
             )))
 
+def override_release_values(chart: str, values: dict, release_name: str = None):
+    """
+    Merge `values` into the Helm releases of `chart` ( optionally only the one named `release_name` ),
+    for chart settings not exposed by the `python_pulumi_helm` release functions.
+    `values` can also be a function returning the updated values, for changes a merge can't express ( e.g. list items ).
+    Must be called before the release is created.
+    """
+    def transformation(args: pulumi.ResourceTransformationArgs):
+        if args.type_ != "kubernetes:helm.sh/v3:Release" or args.props.get("chart") != chart:
+            return None
+        if release_name and release_name not in [args.name, args.props.get("name")]:
+            return None
+
+        props = dict(args.props)
+        props["values"] = pulumi.Output.from_input(props.get("values") or {}).apply(lambda v: values(v) if callable(values) else userdata.deep_merge(v, values))
+        return pulumi.ResourceTransformationResult(props=props, opts=args.opts)
+
+    pulumi.runtime.register_stack_transformation(transformation)
+
 def get_ssl_cert_fingerprint(host: str, port: int = 443):
   cert = ssl.get_server_certificate((host, port))
   der_cert = ssl.PEM_cert_to_DER_cert(cert)
@@ -68,8 +88,44 @@ def get_ssh_public_key(public_key_file: str, resolve_path: bool = True):
 def get_public_ip():
   return requests.get('https://checkip.amazonaws.com').text.rstrip()
 
-def create_kubeconfig(eks_cluster: eks.Cluster, region: pulumi.Input[str]):
-  kubeconfig_yaml = pulumi.Output.all(eks_cluster.name, eks_cluster.endpoint, eks_cluster.certificate_authority).apply(lambda o: f"""
+def create_kubeconfig(eks_cluster: eks.Cluster, region: pulumi.Input[str], token_cache: bool = False):
+
+  return kubeconfig(
+    cluster_name=eks_cluster.name,
+    endpoint=eks_cluster.endpoint,
+    certificate_authority_data=eks_cluster.certificate_authority.apply(lambda ca: ca['data']),
+    region=region,
+    token_cache=token_cache,
+  )
+
+def kubeconfig(cluster_name: pulumi.Input[str], endpoint: pulumi.Input[str], certificate_authority_data: pulumi.Input[str], region: pulumi.Input[str], token_cache: bool = False):
+
+  # Cached tokens from the bundled `eks_token.py` plugin, instead of starting the AWS CLI for every call.
+  # Run by the project virtualenv ( `virtualenv` of Pulumi.yaml ), the one having botocore. Paths are relative to the project
+  # directory, the working directory of the provider and the program, so the kubeconfig kept in the state is the same on every host
+  def exec_command(cluster_name: str)->str:
+    if token_cache:
+      return f"""
+        command: venv/bin/python
+        args:
+          - eks_token.py
+          - --region
+          - {region}
+          - --cluster-name
+          - {cluster_name}"""
+    return f"""
+        command: aws
+        args:
+          - --region
+          - {region}
+          - eks
+          - get-token
+          - --cluster-name
+          - {cluster_name}
+          - --output
+          - json"""
+
+  kubeconfig_yaml = pulumi.Output.all(cluster_name, endpoint, certificate_authority_data).apply(lambda o: f"""
 apiVersion: v1
 kind: Config
 current-context: {o[0]}
@@ -80,7 +136,7 @@ clusters:
     cluster:
       api-version: v1
       server: {o[1]}
-      certificate-authority-data: {o[2]['data']}
+      certificate-authority-data: {o[2]}
 contexts:
   - name: {o[0]}
     context:
@@ -91,17 +147,7 @@ users:
   - name: aws
     user:
       exec:
-        apiVersion: client.authentication.k8s.io/v1beta1
-        command: aws
-        args:
-          - --region
-          - {region}
-          - eks
-          - get-token
-          - --cluster-name
-          - {o[0]}
-          - --output
-          - json
+        apiVersion: client.authentication.k8s.io/v1beta1{exec_command(o[0])}
 """)
 
   return kubeconfig_yaml
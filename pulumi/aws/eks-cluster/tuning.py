@@ -0,0 +1,125 @@
+"""
+Node kernel, network and kubelet tuning profiles, rendered into Bottlerocket settings and AL2 user data
+"""
+
+# Conntrack entries per node memory, one per 16 KiB ( 1048576 on a 16 GiB node )
+CONNTRACK_MEMORY_BYTES_PER_ENTRY = 16384
+# Bottlerocket only takes static sysctls: the 16 GiB node value. It is a limit, entries are only allocated for tracked connections
+CONNTRACK_MAX_STATIC = 1048576
+
+# NodePort range of the API server, kept out of the ephemeral ports of the node
+NODE_PORT_RANGE = "30000-32767"
+
+profiles = {
+  # High connection rates: ingress controllers and proxies
+  "ingress-heavy": {
+    "sysctl": {
+      "net.core.somaxconn": "32768",
+      "net.core.netdev_max_backlog": "16384",
+      "net.ipv4.tcp_max_syn_backlog": "16384",
+      "net.ipv4.ip_local_port_range": "1024 65535",
+      "net.ipv4.ip_local_reserved_ports": NODE_PORT_RANGE,
+      "net.ipv4.tcp_tw_reuse": "1",
+      "net.ipv4.tcp_fin_timeout": "15",
+    },
+    # `nf_conntrack_max` from the node memory, `memory` or a number of entries
+    "conntrack_max": "memory",
+    # Combined NIC queues, `max` uses all the queues supported by the ENA device ( AL2 only )
+    "nic_queues": "max",
+    "kubelet": {
+      "image_gc_high_threshold_percent": 85,
+      "image_gc_low_threshold_percent": 80,
+      "registry_qps": 20,
+      "registry_burst": 40,
+    },
+  },
+  # Short-lived pods with many image pulls
+  "batch": {
+    "sysctl": {
+      "net.ipv4.ip_local_port_range": "1024 65535",
+      "net.ipv4.ip_local_reserved_ports": NODE_PORT_RANGE,
+      "fs.inotify.max_user_instances": "8192",
+      "fs.inotify.max_user_watches": "524288",
+    },
+    "kubelet": {
+      "image_gc_high_threshold_percent": 75,
+      "image_gc_low_threshold_percent": 60,
+      "registry_qps": 50,
+      "registry_burst": 100,
+    },
+  },
+  # Databases and search engines: large memory maps, no swapping
+  "stateful": {
+    "sysctl": {
+      "vm.max_map_count": "262144",
+      "vm.swappiness": "1",
+      "vm.dirty_background_ratio": "5",
+      "vm.dirty_ratio": "10",
+      "fs.file-max": "2097152",
+    },
+    "kubelet": {
+      "image_gc_high_threshold_percent": 85,
+      "image_gc_low_threshold_percent": 80,
+      "registry_qps": 5,
+      "registry_burst": 10,
+    },
+  },
+}
+
+# Kubelet settings: Bottlerocket setting name and AL2 kubelet-config.json field
+# `max_pods` is left out of the default profiles, as it depends on the VPC CNI mode ( `aws-eks-cluster:vpc_cni` )
+kubelet_settings = {
+  "max_pods": ("max-pods", "maxPods"),
+  "image_gc_high_threshold_percent": ("image-gc-high-threshold-percent", "imageGCHighThresholdPercent"),
+  "image_gc_low_threshold_percent": ("image-gc-low-threshold-percent", "imageGCLowThresholdPercent"),
+  "registry_qps": ("registry-qps", "registryPullQPS"),
+  "registry_burst": ("registry-burst", "registryBurst"),
+}
+
+def get_profile(name: str)->dict:
+  if name not in profiles:
+    raise ValueError(f"Unknown tuning profile '{name}', expected one of: {', '.join(profiles.keys())}")
+  return profiles[name]
+
+def bottlerocket_settings(profile: dict)->dict:
+  kubernetes = {}
+  for key, value in profile.get("kubelet", {}).items():
+    kubernetes[kubelet_settings[key][0]] = value
+
+  sysctl = dict(profile.get("sysctl", {}))
+  if profile.get("conntrack_max"):
+    sysctl["net.netfilter.nf_conntrack_max"] = str(CONNTRACK_MAX_STATIC if profile["conntrack_max"] == "memory" else profile["conntrack_max"])
+
+  return {
+    "settings": {
+      "kernel": {
+        "sysctl": sysctl,
+      },
+      "kubernetes": kubernetes,
+    }
+  }
+
+def al2_script(profile: dict)->str:
+  lines = []
+
+  if profile.get("sysctl") or profile.get("conntrack_max"):
+    lines.append("cat <<'EOF' > /etc/sysctl.d/99-tuning.conf")
+    for key, value in profile.get("sysctl", {}).items():
+      lines.append(f"{key} = {value}")
+    lines.append("EOF")
+    if profile.get("conntrack_max"):
+      conntrack_max = f"$(( $(awk '/^MemTotal:/ {{print $2}}' /proc/meminfo) * 1024 / {CONNTRACK_MEMORY_BYTES_PER_ENTRY} ))" if profile["conntrack_max"] == "memory" else profile["conntrack_max"]
+      lines.append(f"echo \"net.netfilter.nf_conntrack_max = {conntrack_max}\" >> /etc/sysctl.d/99-tuning.conf")
+    lines.append("sysctl --system")
+
+  if profile.get("nic_queues"):
+    queues = "$(ethtool -l eth0 | awk '/^Combined:/ {print $2; exit}')" if profile["nic_queues"] == "max" else profile["nic_queues"]
+    lines.append(f"ethtool -L eth0 combined {queues} || true")
+
+  # Kubelet fields not managed by the EKS bootstrap script, which runs after this part
+  kubelet_fields = [ f".{kubelet_settings[key][1]} = {value}" for key, value in profile.get("kubelet", {}).items() if key != "max_pods" ]
+  if kubelet_fields:
+    lines.append("KUBELET_CONFIG=/etc/kubernetes/kubelet/kubelet-config.json")
+    lines.append(f"jq '{' | '.join(kubelet_fields)}' $KUBELET_CONFIG > $KUBELET_CONFIG.tmp && mv $KUBELET_CONFIG.tmp $KUBELET_CONFIG")
+
+  return "\n".join(lines)
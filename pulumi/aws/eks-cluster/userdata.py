@@ -0,0 +1,85 @@
+import base64
+import json
+import re
+import tomllib
+
+"""
+Node user data rendering, shared by the Karpenter node templates and the node group launch template
+"""
+
+def deep_merge(base: dict, override: dict)->dict:
+  merged = dict(base)
+  for key, value in override.items():
+    if isinstance(value, dict) and isinstance(merged.get(key), dict):
+      merged[key] = deep_merge(merged[key], value)
+    else:
+      merged[key] = value
+  return merged
+
+def _toml_key(key: str)->str:
+  if re.fullmatch(r"[A-Za-z0-9_-]+", key):
+    return key
+  return json.dumps(key)
+
+def _toml_value(value)->str:
+  if isinstance(value, bool):
+    return "true" if value else "false"
+  if isinstance(value, (int, float)):
+    return str(value)
+  if isinstance(value, list):
+    return "[" + ", ".join([ _toml_value(v) for v in value ]) + "]"
+  return json.dumps(str(value))
+
+def toml_dumps(settings: dict, prefix: list = [])->str:
+  scalars = { k: v for k, v in settings.items() if not isinstance(v, dict) and not (isinstance(v, list) and v and all(isinstance(i, dict) for i in v)) }
+  tables = { k: v for k, v in settings.items() if isinstance(v, dict) }
+  table_arrays = { k: v for k, v in settings.items() if isinstance(v, list) and v and all(isinstance(i, dict) for i in v) }
+
+  lines = []
+  if prefix and (scalars or not (tables or table_arrays)):
+    lines.append("[" + ".".join([ _toml_key(k) for k in prefix ]) + "]")
+  for key, value in scalars.items():
+    lines.append(f"{_toml_key(key)} = {_toml_value(value)}")
+
+  for key, value in tables.items():
+    table = toml_dumps(value, prefix + [key])
+    if table:
+      lines.append(table)
+
+  for key, items in table_arrays.items():
+    for item in items:
+      lines.append("[[" + ".".join([ _toml_key(k) for k in prefix + [key] ]) + "]]")
+      for item_key, item_value in item.items():
+        lines.append(f"{_toml_key(item_key)} = {_toml_value(item_value)}")
+
+  return "\n".join(lines)
+
+def bottlerocket_userdata(user_data: str, settings: dict)->str:
+  """
+  Merge settings into a Bottlerocket TOML user data document
+  """
+  return toml_dumps(deep_merge(tomllib.loads(user_data or ""), settings))
+
+def al2_userdata(user_data: str, script: str, boundary: str = "BOUNDARY")->str:
+  """
+  Append a shell script part to an AL2 MIME multi-part user data document
+  """
+  part = f"""--{boundary}
+Content-Type: text/x-shellscript; charset="us-ascii"
+
+#!/bin/bash
+{script.strip()}
+
+"""
+  if not user_data:
+    return f"""MIME-Version: 1.0
+Content-Type: multipart/mixed; boundary="{boundary}"
+
+{part}--{boundary}--
+"""
+  closing = f"--{boundary}--"
+  head, _, tail = user_data.rpartition(closing)
+  return f"{head}{part}{closing}{tail}"
+
+def encode(user_data: str)->str:
+  return base64.b64encode(user_data.encode("utf-8")).decode("utf-8")
@@ -2,9 +2,22 @@ from pulumi_aws import ec2, get_availability_zones
 import pulumi
 import tools
 
+aws_region = pulumi.Config("aws").require("region")
+
 aws_config = pulumi.Config("aws-eks-cluster")
 vpc_cidr = aws_config.require("vpc_cidr")
 eks_name_prefix = aws_config.require("name_prefix")
+# Secondary CIDR for the pod subnets ( VPC CNI custom networking ), e.g. 100.64.0.0/16
+vpc_pod_cidr = aws_config.get("vpc_pod_cidr")
+vpc_endpoints_enabled = aws_config.get_bool("vpc_endpoints_enabled") or False
+# Interface endpoints for the highest-volume AWS API paths: image pulls, IRSA and Karpenter
+vpc_interface_endpoints = aws_config.get_object("vpc_interface_endpoints") or [
+  "ecr.api",
+  "ecr.dkr",
+  "sts",
+  "ec2",
+  "ssm",
+]
 
 """
 VPC
@@ -150,6 +163,42 @@ for i in range(0, len(azs.names)):
     subnet_id=private_subnets[i].id,
   )
 
+"""
+Create pod subnets in the secondary CIDR, one per AZ, for the VPC CNI custom networking
+"""
+pod_subnets = []
+
+if vpc_pod_cidr:
+  vpc_pod_cidr_association = ec2.VpcIpv4CidrBlockAssociation(
+    f"{eks_name_prefix}-pods",
+    vpc_id=vpc.id,
+    cidr_block=vpc_pod_cidr,
+  )
+
+  for i in range(0, len(azs.names)):
+
+    pod_subnets.append(
+      ec2.Subnet(
+        f"{eks_name_prefix}-pods-{i}",
+        vpc_id=vpc.id,
+        assign_ipv6_address_on_creation=False,
+        availability_zone=azs.names[i],
+        cidr_block=tools.subnet_calc(vpc_pod_cidr, 19, i),
+        map_public_ip_on_launch=False,
+        tags={
+          "Name": f"{eks_name_prefix}-pods-{i}",
+          f"kubernetes.io/cluster/{eks_name_prefix}": "owned",
+        },
+        opts=pulumi.ResourceOptions(depends_on=[vpc_pod_cidr_association]),
+      )
+    )
+
+    ec2.route_table_association.RouteTableAssociation(
+      f"{eks_name_prefix}-pods-{i}",
+      route_table_id=private_route_table.id,
+      subnet_id=pod_subnets[i].id,
+    )
+
 """
 Cluster additional security group
 """
@@ -178,3 +227,62 @@ security_group_ssh = ec2.SecurityGroup(
     "karpenter.sh/discovery": eks_name_prefix,
   },
 )
+
+"""
+VPC endpoints, to keep S3, ECR and AWS API traffic off the NAT gateway
+"""
+vpc_endpoints = {}
+
+if vpc_endpoints_enabled:
+
+  # Gateway endpoint has no hourly or per-GB cost: image layers from ECR and Thanos/Loki object storage
+  vpc_endpoints["s3"] = ec2.VpcEndpoint(
+    f"{eks_name_prefix}-s3",
+    vpc_id=vpc.id,
+    service_name=f"com.amazonaws.{aws_region}.s3",
+    vpc_endpoint_type="Gateway",
+    route_table_ids=[private_route_table.id],
+    tags={
+      "Name": f"{eks_name_prefix}-s3",
+    },
+  )
+
+  security_group_vpc_endpoints = ec2.SecurityGroup(
+    f"{eks_name_prefix}-vpc-endpoints",
+    description="Allow HTTPS connections to the VPC interface endpoints from the VPC",
+    vpc_id=vpc.id,
+    ingress=[
+      ec2.SecurityGroupIngressArgs(
+        # Pods on the secondary CIDR reach the endpoints through private DNS too ( IRSA, ECR, EC2 )
+        cidr_blocks=[vpc_cidr, vpc_pod_cidr] if vpc_pod_cidr else [vpc_cidr],
+        from_port=443,
+        to_port=443,
+        protocol="tcp",
+      ),
+    ],
+    egress=[
+      ec2.SecurityGroupEgressArgs(
+        cidr_blocks=["0.0.0.0/0"],
+        from_port=0,
+        to_port=0,
+        protocol="-1",
+      )
+    ],
+    tags={
+      "Name": f"{eks_name_prefix}-vpc-endpoints",
+    },
+  )
+
+  for service in vpc_interface_endpoints:
+    vpc_endpoints[service] = ec2.VpcEndpoint(
+      f"{eks_name_prefix}-{service.replace('.', '-')}",
+      vpc_id=vpc.id,
+      service_name=f"com.amazonaws.{aws_region}.{service}",
+      vpc_endpoint_type="Interface",
+      private_dns_enabled=True,
+      subnet_ids=[ s.id for s in private_subnets ],
+      security_group_ids=[security_group_vpc_endpoints.id],
+      tags={
+        "Name": f"{eks_name_prefix}-{service.replace('.', '-')}",
+      },
+    )
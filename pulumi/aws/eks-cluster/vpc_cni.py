@@ -0,0 +1,41 @@
+"""
+VPC CNI settings from `aws-eks-cluster:vpc_cni`: add-on environment and the node max-pods matching prefix delegation
+"""
+
+def env(vpc_cni_config: dict, custom_networking: bool = False)->dict:
+  vpc_cni_env = {}
+
+  if vpc_cni_config.get("prefix_delegation", False):
+    vpc_cni_env.update({
+      "ENABLE_PREFIX_DELEGATION": "true",
+      "WARM_PREFIX_TARGET": str(vpc_cni_config.get("warm_prefix_target", 1)),
+    })
+    # WARM_IP_TARGET/MINIMUM_IP_TARGET take precedence over WARM_PREFIX_TARGET when set
+    if "warm_ip_target" in vpc_cni_config:
+      vpc_cni_env["WARM_IP_TARGET"] = str(vpc_cni_config["warm_ip_target"])
+    if "minimum_ip_target" in vpc_cni_config:
+      vpc_cni_env["MINIMUM_IP_TARGET"] = str(vpc_cni_config["minimum_ip_target"])
+
+  if custom_networking:
+    vpc_cni_env.update({
+      "AWS_VPC_K8S_CNI_CUSTOM_NETWORK_CFG": "true",
+      "ENI_CONFIG_LABEL_DEF": "topology.kubernetes.io/zone",
+    })
+
+  return vpc_cni_env
+
+def bottlerocket_settings(vpc_cni_config: dict)->dict:
+  """
+  Bottlerocket settings shared by the default node group and the Karpenter node templates
+  """
+  if not vpc_cni_config.get("prefix_delegation", False):
+    return {}
+  return { "settings": { "kubernetes": { "max-pods": vpc_cni_config.get("max_pods", 110) } } }
+
+def kubelet_configuration(vpc_cni_config: dict)->dict:
+  """
+  Karpenter provisioners kubelet configuration
+  """
+  if not vpc_cni_config.get("prefix_delegation", False):
+    return {}
+  return { "maxPods": vpc_cni_config.get("max_pods", 110) }
@@ -0,0 +1,123 @@
+import userdata
+
+"""
+Request-rate autoscaling of the sample workloads ( `k8s/manifests/fastapi`, `k8s/manifests/nginx` ): KEDA ScaledObjects on the
+per-ingress request rate reported by ingress-nginx, and PodDisruptionBudgets
+"""
+
+# Overridden per workload from the `workloads:autoscaling` config object
+sample_workloads = {
+  "fastapi": {
+    "namespace": "default",
+    "deployment": "fastapi-deployment",
+    "ingress": "fastapi-ingress",
+    "labels": { "app": "fastapi" },
+    "min_replicas": 2,
+    "max_replicas": 20,
+    "target_rps_per_replica": 10,
+    "min_available": 1,
+  },
+  "nginx": {
+    "namespace": "default",
+    "deployment": "nginx-deployment",
+    "ingress": "nginx-ingress",
+    "labels": { "app": "nginx" },
+    "min_replicas": 2,
+    "max_replicas": 20,
+    "target_rps_per_replica": 10,
+    "min_available": 1,
+  },
+}
+
+# Scale up fast on a ramp, scale down slowly so short dips don't remove capacity
+scaling_behavior = {
+  "scaleUp": {
+    "stabilizationWindowSeconds": 0,
+    "selectPolicy": "Max",
+    "policies": [
+      { "type": "Percent", "value": 100, "periodSeconds": 15 },
+      { "type": "Pods", "value": 4, "periodSeconds": 15 },
+    ],
+  },
+  "scaleDown": {
+    "stabilizationWindowSeconds": 300,
+    "selectPolicy": "Min",
+    "policies": [
+      { "type": "Percent", "value": 25, "periodSeconds": 60 },
+    ],
+  },
+}
+
+def get_workloads(overrides: dict = {})->dict:
+  """
+  Workloads merged with the overrides, a workload set to null is not autoscaled
+  """
+  return { name: workload for name, workload in userdata.deep_merge(sample_workloads, overrides).items() if workload }
+
+def request_rate_query(workload: dict)->str:
+  # Ingress-nginx metrics are scraped in the ingress namespace, the namespace of the ingress is kept as `exported_namespace`.
+  # The sum merges the controller pods scraped by different Prometheus shards, as returned by Thanos Query ( `prometheus.query_address` )
+  return f'sum(rate(nginx_ingress_controller_requests{{exported_namespace="{workload["namespace"]}",ingress="{workload["ingress"]}"}}[1m]))'
+
+def autoscaling_objs(name: str, workload: dict, prometheus_address: str)->list:
+  """
+  ScaledObject and PodDisruptionBudget of a workload, `prometheus_address` must see the series of every Prometheus shard
+  """
+  scaled_object = {
+    "apiVersion": "keda.sh/v1alpha1",
+    "kind": "ScaledObject",
+    "metadata": {
+      "name": name,
+      "namespace": workload["namespace"],
+      "labels": workload["labels"],
+    },
+    "spec": {
+      "scaleTargetRef": {
+        "name": workload["deployment"],
+      },
+      "minReplicaCount": workload["min_replicas"],
+      "maxReplicaCount": workload["max_replicas"],
+      "pollingInterval": 15,
+      "cooldownPeriod": 300,
+      "advanced": {
+        "horizontalPodAutoscalerConfig": {
+          "behavior": scaling_behavior,
+        },
+      },
+      "triggers": [
+        {
+          "type": "prometheus",
+          "metricType": "AverageValue",
+          "metadata": {
+            "serverAddress": prometheus_address,
+            "threshold": str(workload["target_rps_per_replica"]),
+            "query": request_rate_query(workload),
+          },
+        },
+      ],
+    },
+  }
+
+  pod_disruption_budget = {
+    "apiVersion": "policy/v1",
+    "kind": "PodDisruptionBudget",
+    "metadata": {
+      "name": name,
+      "namespace": workload["namespace"],
+      "labels": workload["labels"],
+    },
+    "spec": {
+      "minAvailable": workload["min_available"],
+      "selector": {
+        "matchLabels": workload["labels"],
+      },
+    },
+  }
+
+  return [scaled_object, pod_disruption_budget]
+
+def generate_autoscaling(workloads: dict, prometheus_address: str)->list:
+  objs = []
+  for name, workload in workloads.items():
+    objs.extend(autoscaling_objs(name, workload, prometheus_address))
+  return objs
@@ -1,6 +1,12 @@
 import iam
 import pulumi
 from pulumi_aws import lambda_, apigatewayv2, cloudwatch, route53, acm, get_caller_identity
+from os import path
+import sys
+
+# Lambda artifacts builder shared by the Lambda projects
+sys.path.append(path.join(path.dirname(path.abspath(__file__)), ".."))
+import lambda_build
 
 aws_config = pulumi.Config("aws")
 route53_config = pulumi.Config("route53")
@@ -13,14 +19,16 @@ dns_private_zone = route53_config.require_bool("private_zone")
 ecr_registry = f"{aws_account_id}.dkr.ecr.{aws_region}.amazonaws.com"
 
 """
-Create a Lambda function, using the IAM role and Python code in the 'src' folder
+Create a Lambda function, using the IAM role and the archive of the code in the 'src' folder ( without `event-example.json` )
 """
+lambda_artifact = lambda_build.build_function("ecr-custom-domain-proxy", "./src", runtime="nodejs18.x")
+
 lambda_function = lambda_.Function(
     "ecr-custom-domain-proxy",
     architectures=["arm64"],
-    code=pulumi.AssetArchive({
-        ".": pulumi.FileArchive("./src")
-    }),
+    # No update, nor new published version, while the archive hash is unchanged
+    code=pulumi.FileArchive(lambda_artifact["path"]),
+    source_code_hash=lambda_artifact["sha256"],
     environment={
         "variables": {
             "AWS_ECR_REGISTRY": ecr_registry
@@ -143,3 +151,4 @@ pulumi.export("custom_ecr_registry", apigateway_domain_name.domain_name)
 pulumi.export("route53_zone_id", route53_zone.zone_id)
 pulumi.export("acm_certificate_domain_name", acm_certificate.domain)
 pulumi.export("acm_certificate_arn", acm_certificate.arn)
+pulumi.export("lambda_archive_size", lambda_artifact["size"])
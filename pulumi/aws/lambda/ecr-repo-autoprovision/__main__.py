@@ -1,30 +1,56 @@
-import ecr, iam, cloudwatch
+import ecr, iam, cloudwatch, pull_through_cache, replication
 
 import pulumi
 from pulumi_aws import lambda_
 from pulumi_aws import cloudwatch as aws_cloudwatch
+from os import path
+import sys
+
+# Lambda artifacts builder shared by the Lambda projects
+sys.path.append(path.join(path.dirname(path.abspath(__file__)), ".."))
+import lambda_build
+
+lambda_runtime = "python3.8"
+# Runtime image precompiling the bytecode, pinned by digest ( sources only when unset )
+bytecode_image = pulumi.Config("lambda").get("bytecode_image")
+
+"""
+Build the function archive from the Python code in the 'src' folder, and its dependencies layer
+"""
+lambda_artifact = lambda_build.build_function("lambda-ecr-repo-creation", "./src", runtime=lambda_runtime, bytecode_image=bytecode_image)
+lambda_layer = lambda_build.dependencies_layer(
+  "lambda-ecr-repo-creation",
+  lambda_build.build_dependencies("lambda-ecr-repo-creation", "./src/requirements.txt", runtime=lambda_runtime, bytecode_image=bytecode_image),
+  runtime=lambda_runtime,
+)
 
 """
-Create a Lambda function, using the IAM role and Python code in the 'src' folder
+Create a Lambda function, using the IAM role and the archive built above
 """
 lambda_function = lambda_.Function(
   resource_name="lambda-ecr-repo-creation",
-  code=pulumi.AssetArchive({
-    ".": pulumi.FileArchive("./src")
-  }),
+  # No update, nor new published version, while the archive hash is unchanged
+  code=pulumi.FileArchive(lambda_artifact["path"]),
+  source_code_hash=lambda_artifact["sha256"],
+  layers=[lambda_layer.arn],
   environment={
     "variables": {
       "ECR_REPO_NAME": "test-repo",
       "ECR_REPO_LIFECYCLE_POLICY": pulumi.Output.json_dumps(ecr.lifecycle_policy),
       "ECR_REPO_POLICY": pulumi.Output.json_dumps(ecr.repository_policy),
+      "ECR_REPLICATION_REGIONS": pulumi.Output.json_dumps(replication.replication_regions),
+      "ECR_REPLICATION_PREFIXES": pulumi.Output.json_dumps(replication.replication_prefixes),
+      "METRICS_NAMESPACE": cloudwatch.metrics_namespace,
     }
   },
   description="Lambda function to create ECR repos automatically",
   handler="lambda_function.lambda_handler",
   memory_size=128,
+  # Repositories are also created in the replication regions
+  timeout=30,
   publish=True,
   role=iam.lamba_role.arn,
-  runtime="python3.8",
+  runtime=lambda_runtime,
   tracing_config=lambda_.FunctionTracingConfigArgs(
     mode="Active"
   ),
@@ -51,3 +77,10 @@ lambda_permission_eventbridge = lambda_.Permission(
   principal="events.amazonaws.com",
   source_arn=cloudwatch.eventbridge_rule.arn,
 )
+
+"""
+Alarm on the provisioning latency and the error rate of the Lambda function
+"""
+lambda_alarms = cloudwatch.create_alarms(function_name=lambda_function.name, region=pulumi.Config("aws").require("region"))
+
+pulumi.export("lambda_archive_size", lambda_artifact["size"])
@@ -31,3 +31,77 @@ eventbridge_rule = cloudwatch.EventRule(
   ),
   is_enabled=True,
 )
+
+"""
+Alarms on the metrics of the Lambda function ( Embedded Metric Format records, see `src/lambda_function.py` ) and its error rate
+"""
+metrics_namespace = "ECRRepoAutoprovision"
+
+alarms_config = pulumi.Config("alarms")
+# Alarm notifications, no actions when unset
+alarm_actions = alarms_config.get_object("actions") or []
+
+def create_alarms(function_name: str, region: str)->list:
+
+  provisioning_latency_alarm = cloudwatch.MetricAlarm(
+    resource_name="lambda-ecr-repo-creation-provisioning-latency",
+    alarm_description="p95 time from the first failed push to a provisioned ECR repository",
+    namespace=metrics_namespace,
+    metric_name="ProvisioningLatency",
+    dimensions={
+      "Region": region,
+    },
+    extended_statistic="p95",
+    period=3600,
+    evaluation_periods=1,
+    comparison_operator="GreaterThanThreshold",
+    threshold=alarms_config.get_float("provisioning_latency_p95_ms") or 60000,
+    treat_missing_data="notBreaching",
+    alarm_actions=alarm_actions,
+    ok_actions=alarm_actions,
+  )
+
+  error_rate_alarm = cloudwatch.MetricAlarm(
+    resource_name="lambda-ecr-repo-creation-error-rate",
+    alarm_description="Percentage of failed invocations of the ECR repository provisioning function",
+    comparison_operator="GreaterThanThreshold",
+    threshold=alarms_config.get_float("error_rate_percent") or 5,
+    evaluation_periods=1,
+    treat_missing_data="notBreaching",
+    metric_queries=[
+      cloudwatch.MetricAlarmMetricQueryArgs(
+        id="error_rate",
+        expression="100 * errors / MAX([errors, invocations])",
+        label="Error rate",
+        return_data=True,
+      ),
+      cloudwatch.MetricAlarmMetricQueryArgs(
+        id="errors",
+        metric=cloudwatch.MetricAlarmMetricQueryMetricArgs(
+          namespace="AWS/Lambda",
+          metric_name="Errors",
+          dimensions={
+            "FunctionName": function_name,
+          },
+          period=3600,
+          stat="Sum",
+        ),
+      ),
+      cloudwatch.MetricAlarmMetricQueryArgs(
+        id="invocations",
+        metric=cloudwatch.MetricAlarmMetricQueryMetricArgs(
+          namespace="AWS/Lambda",
+          metric_name="Invocations",
+          dimensions={
+            "FunctionName": function_name,
+          },
+          period=3600,
+          stat="Sum",
+        ),
+      ),
+    ],
+    alarm_actions=alarm_actions,
+    ok_actions=alarm_actions,
+  )
+
+  return [provisioning_latency_alarm, error_rate_alarm]
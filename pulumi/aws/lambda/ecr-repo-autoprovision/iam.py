@@ -29,6 +29,14 @@ lambda_policy = iam.Policy(
           ],
           "Resource": "*",
           "Effect": "Allow"
+        },
+        {
+          "Action": [
+            "xray:PutTraceSegments",
+            "xray:PutTelemetryRecords"
+          ],
+          "Resource": "*",
+          "Effect": "Allow"
         }
       ]
     }
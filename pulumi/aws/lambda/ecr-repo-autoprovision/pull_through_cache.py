@@ -0,0 +1,49 @@
+import pulumi
+from pulumi_aws import ecr
+
+"""
+Create ECR pull-through cache rules for the public registries, so images are pulled from ECR in the region of the clusters.
+Docker Hub and ghcr.io need the ARN of a Secrets Manager secret named `ecr-pullthroughcache/<name>` with the registry credentials
+"""
+ecr_config = pulumi.Config("ecr")
+
+# Repository prefix in ECR and upstream registry, overridden or extended from the `ecr:pull_through_cache` config object
+upstream_registries = {
+  "docker-hub": {
+    "upstream_registry_url": "registry-1.docker.io",
+    "credentials_required": True,
+  },
+  "quay": {
+    "upstream_registry_url": "quay.io",
+  },
+  "ghcr": {
+    "upstream_registry_url": "ghcr.io",
+    "credentials_required": True,
+  },
+  "registry-k8s-io": {
+    "upstream_registry_url": "registry.k8s.io",
+  },
+}
+
+pull_through_cache_config = ecr_config.get_object("pull_through_cache") or {}
+
+pull_through_cache_rules = {}
+pull_through_cache_upstreams = {}
+for prefix, registry in { **upstream_registries, **pull_through_cache_config }.items():
+  if not registry:
+    continue
+  registry = { **upstream_registries.get(prefix, {}), **registry }
+
+  if registry.get("credentials_required") and not registry.get("credential_arn"):
+    pulumi.log.warn(f"Pull-through cache rule '{prefix}' skipped, the upstream registry {registry['upstream_registry_url']} needs a `credential_arn`")
+    continue
+
+  pull_through_cache_rules[prefix] = ecr.PullThroughCacheRule(
+    resource_name=f"pull-through-cache-{prefix}",
+    ecr_repository_prefix=prefix,
+    upstream_registry_url=registry["upstream_registry_url"],
+    credential_arn=registry.get("credential_arn"),
+  )
+  pull_through_cache_upstreams[prefix] = registry["upstream_registry_url"]
+
+pulumi.export("pull_through_cache_prefixes", pull_through_cache_upstreams)
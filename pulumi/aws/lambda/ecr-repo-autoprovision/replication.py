@@ -0,0 +1,40 @@
+import pulumi
+from pulumi_aws import ecr, get_caller_identity
+
+"""
+Create the registry replication configuration, replicating the repositories to other regions.
+The Lambda function creates the same repositories in the destination regions ( see `src/lambda_function.py` ), so replicas get the same policies
+"""
+ecr_config = pulumi.Config("ecr")
+
+# `ecr:replication` config object: destination `regions`, and optional `repository_prefixes` filters ( all repositories when unset )
+replication_config = ecr_config.get_object("replication") or {}
+replication_regions = replication_config.get("regions", [])
+replication_prefixes = replication_config.get("repository_prefixes", [])
+
+if replication_regions:
+  aws_account_id = get_caller_identity().account_id
+
+  replication_configuration = ecr.ReplicationConfiguration(
+    resource_name="ecr-replication",
+    replication_configuration=ecr.ReplicationConfigurationReplicationConfigurationArgs(
+      rules=[
+        ecr.ReplicationConfigurationReplicationConfigurationRuleArgs(
+          destinations=[
+            ecr.ReplicationConfigurationReplicationConfigurationRuleDestinationArgs(
+              region=region,
+              registry_id=aws_account_id,
+            ) for region in replication_regions
+          ],
+          repository_filters=[
+            ecr.ReplicationConfigurationReplicationConfigurationRuleRepositoryFilterArgs(
+              filter=prefix,
+              filter_type="PREFIX_MATCH",
+            ) for prefix in replication_prefixes
+          ] or None,
+        ),
+      ],
+    ),
+  )
+
+pulumi.export("replication_regions", replication_regions)
@@ -1,56 +1,168 @@
-from email.mime import image
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
 import boto3
 import botocore.exceptions
 import json
 import os
+import threading
+import time
 
-def lambda_handler(event, context):
+# X-Ray subsegments when the SDK is packaged with the function, the function trace only otherwise
+try:
+    from aws_xray_sdk.core import xray_recorder
+except ImportError:
+    xray_recorder = None
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "ECRRepoAutoprovision")
+
+# Records printed from the region workers, one JSON document per line
+metrics_lock = threading.Lock()
+
+def emit_metric(name, value, unit, **dimensions):
     """
-    Lambda handler to create ECR repos automatically
+    Print a CloudWatch Embedded Metric Format record, extracted into a metric by CloudWatch Logs
     """
-    ecr_client = boto3.client("ecr")
-    ecr_repo_name = event["detail"]["requestParameters"]["repositoryName"]
-    ecr_repo_lifecycle_policy = json.loads(os.environ["ECR_REPO_LIFECYCLE_POLICY"])
-    ecr_repo_policy = json.loads(os.environ["ECR_REPO_POLICY"])
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [
+                        {
+                            "Name": name,
+                            "Unit": unit
+                        }
+                    ]
+                }
+            ]
+        },
+        name: value,
+        **dimensions,
+    }
+    with metrics_lock:
+        print(json.dumps(record), flush=True)
+
+def subsegment(name):
+    return xray_recorder.in_subsegment(name) if xray_recorder else nullcontext()
 
+@contextmanager
+def timed_call(ecr_client, operation, ecr_repo_name):
+    """
+    Time an ECR call into the `CallLatency` metric, in an X-Ray subsegment
+    """
+    region = ecr_client.meta.region_name
+    start = time.monotonic()
+    with subsegment(f"ecr.{operation}") as segment:
+        if segment:
+            segment.put_annotation("region", region)
+            segment.put_annotation("repository", ecr_repo_name)
+        try:
+            yield
+        finally:
+            emit_metric("CallLatency", (time.monotonic() - start) * 1000, "Milliseconds", Operation=operation, Region=region)
+
+def event_age(event):
+    """
+    Milliseconds since the failed push ( CloudTrail `eventTime` ) that triggered the function
+    """
+    event_time = datetime.strptime(event["detail"]["eventTime"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - event_time).total_seconds() * 1000
+
+def provision_repository(ecr_client, ecr_repo_name, event, ecr_repo_lifecycle_policy, ecr_repo_policy):
+    """
+    Create an ECR repo with its lifecycle and repository policies, in the region of the client
+    """
+    region = ecr_client.meta.region_name
+    created = True
     try:
-        ecr_client.create_repository(
-            repositoryName=ecr_repo_name,
-            imageScanningConfiguration={
-                "scanOnPush": True
-            },
-            imageTagMutability="MUTABLE",
-            encryptionConfiguration={
-                "encryptionType": "AES256"
-            },
-            tags=[
-                {
-                    'Key':'auto-create',
-                    'Value':'true'
+        with timed_call(ecr_client, "CreateRepository", ecr_repo_name):
+            ecr_client.create_repository(
+                repositoryName=ecr_repo_name,
+                imageScanningConfiguration={
+                    "scanOnPush": True
                 },
-                {
-                    'Key':'creation-date',
-                    'Value': event["detail"]["eventTime"]
-                },
-                {
-                    'Key':'creator-id',
-                    'Value': event["detail"]["userIdentity"]["principalId"]
+                imageTagMutability="MUTABLE",
+                encryptionConfiguration={
+                    "encryptionType": "AES256"
                 },
-            ],
-        )
+                tags=[
+                    {
+                        'Key':'auto-create',
+                        'Value':'true'
+                    },
+                    {
+                        'Key':'creation-date',
+                        'Value': event["detail"]["eventTime"]
+                    },
+                    {
+                        'Key':'creator-id',
+                        'Value': event["detail"]["userIdentity"]["principalId"]
+                    },
+                ],
+            )
+    except botocore.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] == "RepositoryAlreadyExistsException":
+            print(f"Repository already exists in {region}")
+            emit_metric("RepositoryAlreadyExists", 1, "Count", Region=region)
+            created = False
+        else:
+            raise e
+
+    # Policies are applied to existing repos too: a retried invocation after a failed policy call, or a replica
+    # repo created by the replication first. Both calls overwrite the current policy
+    with timed_call(ecr_client, "PutLifecyclePolicy", ecr_repo_name):
         ecr_client.put_lifecycle_policy(
             repositoryName=ecr_repo_name,
             lifecyclePolicyText=json.dumps(ecr_repo_lifecycle_policy)
         )
+    with timed_call(ecr_client, "SetRepositoryPolicy", ecr_repo_name):
         ecr_client.set_repository_policy(
             repositoryName=ecr_repo_name,
             policyText=json.dumps(ecr_repo_policy)
         )
-    except botocore.exceptions.ClientError as e:
-        if e.response["Error"]["Code"] == "RepositoryAlreadyExistsException":
-            print("Repository already exists")
-        else:
-            raise e
+
+    if created:
+        # From the first failed push to a repo ready to receive it
+        emit_metric("ProvisioningLatency", event_age(event), "Milliseconds", Region=region)
+        emit_metric("RepositoryCreated", 1, "Count", Region=region)
+
+def replication_regions(ecr_repo_name):
+    """
+    Destination regions of the registry replication, when the repo matches one of its prefix filters
+    """
+    regions = json.loads(os.environ.get("ECR_REPLICATION_REGIONS", "[]"))
+    prefixes = json.loads(os.environ.get("ECR_REPLICATION_PREFIXES", "[]"))
+    if prefixes and not any(ecr_repo_name.startswith(prefix) for prefix in prefixes):
+        return []
+    return regions
+
+def lambda_handler(event, context):
+    """
+    Lambda handler to create ECR repos automatically
+    """
+    ecr_client = boto3.client("ecr")
+    ecr_repo_name = event["detail"]["requestParameters"]["repositoryName"]
+    ecr_repo_lifecycle_policy = json.loads(os.environ["ECR_REPO_LIFECYCLE_POLICY"])
+    ecr_repo_policy = json.loads(os.environ["ECR_REPO_POLICY"])
+
+    provision_repository(ecr_client, ecr_repo_name, event, ecr_repo_lifecycle_policy, ecr_repo_policy)
+
+    # Replicas are pushed into the existing repos of the destination regions, created with the same policies
+    regions = replication_regions(ecr_repo_name)
+    if regions:
+        # Clients are created up front, the default boto3 session is not thread-safe
+        region_clients = [boto3.client("ecr", region_name=region) for region in regions]
+        with ThreadPoolExecutor(max_workers=len(region_clients)) as executor:
+            futures = [
+                executor.submit(provision_repository, region_client, ecr_repo_name, event, ecr_repo_lifecycle_policy, ecr_repo_policy)
+                for region_client in region_clients
+            ]
+        # Every region is attempted before the first error is raised
+        for future in futures:
+            future.result()
 
     return {
         "statusCode": 200,
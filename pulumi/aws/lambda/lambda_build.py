@@ -0,0 +1,161 @@
+from os import path
+import pulumi
+from pulumi_aws import lambda_
+import base64
+import fnmatch
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+"""
+Lambda artifacts shared by the Lambda projects: deterministic archives ( sorted entries, fixed timestamps ) of the function code,
+optionally with bytecode precompiled in the runtime image, and third-party dependencies in a content-addressed layer.
+Unchanged sources give the same archive hash, so no new function or layer version is published
+"""
+
+# Files of the source folder left out of the archives
+default_excludes = [
+  "__pycache__",
+  "*.pyc",
+  "*-example.json",
+  "test",
+  "tests",
+  "fixtures",
+  "requirements.txt",
+  ".*",
+]
+
+# Timestamp of every archive entry, the earliest a zip file can hold
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+def excluded(relative_path: str, excludes: list)->bool:
+  return any(fnmatch.fnmatch(part, pattern) for part in relative_path.split(os.sep) for pattern in excludes)
+
+def archive_files(source_dir: str, excludes: list = [])->list:
+  files = []
+  for root, dirs, names in os.walk(source_dir):
+    for name in names:
+      relative_path = path.relpath(path.join(root, name), source_dir)
+      if not excluded(relative_path, excludes):
+        files.append(relative_path)
+  return sorted(files)
+
+def write_archive(source_dir: str, archive_path: str, excludes: list = [])->str:
+  """
+  Zip a folder with sorted entries, fixed timestamps and permissions, and return the base64 SHA-256 of the archive ( Lambda `CodeSha256` )
+  """
+  with tempfile.NamedTemporaryFile(dir=path.dirname(archive_path), delete=False) as f:
+    with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+      for relative_path in archive_files(source_dir, excludes):
+        entry = zipfile.ZipInfo(relative_path.replace(os.sep, "/"), date_time=ZIP_DATE_TIME)
+        entry.external_attr = 0o644 << 16
+        entry.compress_type = zipfile.ZIP_DEFLATED
+        with open(path.join(source_dir, relative_path), "rb") as source:
+          archive.writestr(entry, source.read())
+
+  digest = file_sha256(f.name)
+  # The archive is left untouched when the content did not change
+  if path.exists(archive_path) and file_sha256(archive_path) == digest:
+    os.remove(f.name)
+  else:
+    os.replace(f.name, archive_path)
+
+  return digest
+
+def file_sha256(file_path: str)->str:
+  with open(file_path, "rb") as f:
+    return base64.b64encode(hashlib.sha256(f.read()).digest()).decode("utf-8")
+
+def compile_bytecode(staging_dir: str, image: str, destination: str = "/var/task"):
+  """
+  Hash-based `.pyc` files not checked against their sources, so imports skip the source compilation and timestamps stay out of the archive.
+  Compiled in the runtime image ( pinned by digest ), never by an interpreter of the host, so the archive hash is the same on every host
+  """
+  subprocess.run(
+    [
+      "docker", "run", "--rm", "--network", "none",
+      "--user", f"{os.getuid()}:{os.getgid()}",
+      "--volume", f"{path.abspath(staging_dir)}:/build",
+      "--entrypoint", "python3",
+      image,
+      "-m", "compileall", "-q", "-d", destination, "--invalidation-mode", "unchecked-hash", "/build",
+    ],
+    check=True,
+  )
+
+def report(name: str, archive_path: str, digest: str):
+  pulumi.log.info(f"{name}: {path.basename(archive_path)} {path.getsize(archive_path) / 1024:.1f} KiB, sha256 {digest}")
+
+def build_function(name: str, source_dir: str, runtime: str, build_dir: str = ".build", excludes: list = default_excludes, bytecode_image: str = None)->dict:
+  """
+  Function archive of `source_dir`, returns its `path`, `sha256` ( for `source_code_hash` ) and `size`.
+  Python sources are precompiled only with a `bytecode_image`, otherwise the archive holds the sources alone
+  """
+  os.makedirs(build_dir, exist_ok=True)
+  archive_path = path.join(build_dir, f"{name}.zip")
+
+  with tempfile.TemporaryDirectory() as staging_dir:
+    for relative_path in archive_files(source_dir, excludes):
+      os.makedirs(path.dirname(path.join(staging_dir, relative_path)), exist_ok=True)
+      shutil.copyfile(path.join(source_dir, relative_path), path.join(staging_dir, relative_path))
+    if bytecode_image and runtime.startswith("python"):
+      compile_bytecode(staging_dir, bytecode_image)
+    digest = write_archive(staging_dir, archive_path)
+
+  report(name, archive_path, digest)
+  return { "path": archive_path, "sha256": digest, "size": path.getsize(archive_path) }
+
+def pip_platform(architecture: str)->str:
+  return "manylinux2014_aarch64" if architecture == "arm64" else "manylinux2014_x86_64"
+
+def build_dependencies(name: str, requirements_file: str, runtime: str, architecture: str = "x86_64", build_dir: str = ".build", bytecode_image: str = None)->dict:
+  """
+  Layer archive of the requirements, installed as wheels of the Lambda platform under `python/`.
+  Archives are cached by the hash of the requirements, runtime, architecture and bytecode image, so the packages are only downloaded when they change
+  """
+  os.makedirs(build_dir, exist_ok=True)
+  with open(requirements_file, "rb") as f:
+    inputs = hashlib.sha256(f.read() + runtime.encode("utf-8") + architecture.encode("utf-8") + (bytecode_image or "").encode("utf-8")).hexdigest()[:16]
+  archive_path = path.join(build_dir, f"{name}-deps-{inputs}.zip")
+
+  if not path.exists(archive_path):
+    with tempfile.TemporaryDirectory() as staging_dir:
+      subprocess.run(
+        [
+          sys.executable, "-m", "pip", "install", "--quiet", "--no-compile", "--no-deps",
+          "--requirement", requirements_file,
+          "--target", path.join(staging_dir, "python"),
+          "--platform", pip_platform(architecture),
+          "--implementation", "cp",
+          "--python-version", runtime[len("python"):],
+          "--only-binary", ":all:",
+        ],
+        check=True,
+      )
+      # Layers are extracted under /opt
+      if bytecode_image:
+        compile_bytecode(staging_dir, bytecode_image, destination="/opt")
+      write_archive(staging_dir, archive_path)
+
+  digest = file_sha256(archive_path)
+  report(f"{name}-deps", archive_path, digest)
+  return { "path": archive_path, "sha256": digest, "size": path.getsize(archive_path) }
+
+def dependencies_layer(name: str, artifact: dict, runtime: str, architecture: str = "x86_64")->lambda_.LayerVersion:
+  """
+  Layer version of a dependencies archive, replaced only when the archive hash changes.
+  Previous versions are kept, they are still used by the published function versions
+  """
+  return lambda_.LayerVersion(
+    resource_name=f"{name}-deps",
+    layer_name=f"{name}-deps",
+    code=pulumi.FileArchive(artifact["path"]),
+    source_code_hash=artifact["sha256"],
+    compatible_runtimes=[runtime],
+    compatible_architectures=[architecture],
+    skip_destroy=True,
+  )
@@ -0,0 +1,113 @@
+"""
+Pulumi mocks with canned invoke results and computed resource outputs, so the programs evaluate without credentials or network
+"""
+import base64
+import collections
+import yaml
+import pulumi
+
+ACCOUNT_ID = "123456789012"
+REGION = "eu-central-1"
+
+# Computed outputs read by the programs, by resource type
+resource_outputs = {
+    "aws:eks/cluster:Cluster": lambda name: {
+        "endpoint": f"https://{name}.gr7.{REGION}.eks.amazonaws.com",
+        "certificateAuthority": { "data": base64.b64encode(b"mock-ca").decode("utf-8") },
+        "identities": [ { "oidcs": [ { "issuer": f"https://oidc.eks.{REGION}.amazonaws.com/id/MOCK" } ] } ],
+    },
+    "aws:ec2/launchTemplate:LaunchTemplate": lambda name: {
+        "latestVersion": 1,
+    },
+    "aws:s3/bucket:Bucket": lambda name: {
+        "bucketRegionalDomainName": f"{name}.s3.{REGION}.amazonaws.com",
+    },
+    "aws:s3/bucketV2:BucketV2": lambda name: {
+        "bucketRegionalDomainName": f"{name}.s3.{REGION}.amazonaws.com",
+    },
+    "aws:acm/certificate:Certificate": lambda name: {
+        "domainValidationOptions": [
+            {
+                "resourceRecordName": f"_mock.{name}.",
+                "resourceRecordType": "CNAME",
+                "resourceRecordValue": f"_mock.{name}.acm-validations.aws.",
+            }
+        ],
+    },
+    "aws:cloudfront/distribution:Distribution": lambda name: {
+        "domainName": f"{name}.cloudfront.net",
+        "hostedZoneId": "Z2FDTNDATAQYW2",
+    },
+    "aws:route53/record:Record": lambda name: {
+        "fqdn": f"{name}.mock.",
+    },
+    "random:index/randomString:RandomString": lambda name: {
+        "result": "mockrandomstring",
+    },
+    "kubernetes:helm.sh/v3:Release": lambda name: {
+        "status": { "name": name, "status": "deployed", "namespace": "default", "revision": 1 },
+    },
+}
+
+class Mocks(pulumi.runtime.Mocks):
+    """
+    Counts the registered resources and invokes, `azs` sets the number of availability zones returned to the programs
+    """
+    def __init__(self, azs: int = 3):
+        self.azs = azs
+        self.resources = collections.Counter()
+        self.invokes = collections.Counter()
+
+    def invoke_results(self, token: str, args: dict)->dict:
+        # Manifests of `ConfigGroup` and `ConfigFile`, decoded by the Kubernetes provider
+        if token == "kubernetes:yaml:decode":
+            return { "result": [ obj for obj in yaml.safe_load_all(args["text"]) if obj ] }
+
+        names = [ f"{REGION}{chr(ord('a') + i)}" for i in range(self.azs) ]
+        return {
+            "aws:index/getCallerIdentity:getCallerIdentity": {
+                "accountId": ACCOUNT_ID,
+                "arn": f"arn:aws:iam::{ACCOUNT_ID}:user/benchmark",
+                "userId": "AIDAMOCK",
+            },
+            "aws:index/getRegion:getRegion": {
+                "name": REGION,
+            },
+            "aws:index/getAvailabilityZones:getAvailabilityZones": {
+                "names": names,
+                "zoneIds": [ f"euc1-az{i + 1}" for i in range(self.azs) ],
+            },
+            "aws:route53/getZone:getZone": {
+                "zoneId": "Z0MOCKZONE",
+                "name": args.get("name", "mock.example.com"),
+            },
+            "aws:acm/getCertificate:getCertificate": {
+                "arn": f"arn:aws:acm:{REGION}:{ACCOUNT_ID}:certificate/mock",
+                "domain": args.get("domain", "mock.example.com"),
+            },
+            "aws:s3/getCanonicalUserId:getCanonicalUserId": {
+                "id": "mockcanonicaluserid",
+            },
+            "aws:cloudfront/getLogDeliveryCanonicalUserId:getLogDeliveryCanonicalUserId": {
+                "id": "mocklogdeliverycanonicaluserid",
+            },
+            "aws:ebs/getSnapshotIds:getSnapshotIds": {
+                "ids": [],
+            },
+        }.get(token, {})
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        self.resources[args.typ] += 1
+
+        state = {
+            "arn": f"arn:aws:mock:{REGION}:{ACCOUNT_ID}:{args.name}",
+            "name": args.name,
+        }
+        state.update(resource_outputs.get(args.typ, lambda name: {})(args.name))
+        state.update(args.inputs)
+
+        return [f"{args.name}-id", state]
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        self.invokes[args.token] += 1
+        return self.invoke_results(args.token, args.args)
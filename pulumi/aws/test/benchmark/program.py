@@ -0,0 +1,95 @@
+"""
+Evaluate a single Pulumi program under mocks and print its measurements as JSON
+
+  python program.py --project-dir ../../eks-cluster --stack dev --azs 3 --config '{"helm:thanos": true}'
+
+Runs in its own interpreter ( started by `run.py` ), so the import time of the program and its SDKs is measured too.
+"""
+from os import path
+import argparse
+import importlib
+import json
+import os
+import resource
+import runpy
+import socket
+import sys
+import time
+
+start = time.perf_counter()
+
+import yaml
+import pulumi
+from mocks import Mocks
+
+# Project helpers reaching the network, replaced by canned results
+canned_calls = {
+    "tools.get_public_ip": "203.0.113.10",
+    "tools.get_ssl_cert_fingerprint": "9e99a48a9960b14926bb7f3b02e22da2b0ab7280",
+    "tools.get_ssh_public_key_from_gh": "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIMockKey benchmark",
+}
+
+def block_network():
+    def connect(*args, **kwargs):
+        raise RuntimeError("Network access is disabled during the benchmark")
+    socket.socket.connect = connect
+
+def stub_calls(project_dir: str):
+    for target, result in canned_calls.items():
+        module_name, function_name = target.rsplit(".", 1)
+        if not path.exists(path.join(project_dir, f"{module_name}.py")):
+            continue
+        module = importlib.import_module(module_name)
+        setattr(module, function_name, lambda *args, result=result, **kwargs: result)
+
+def load_config(project_dir: str, stack: str, overrides: dict)->dict:
+    with open(path.join(project_dir, f"Pulumi.{stack}.yaml"), "r") as f:
+        config = yaml.safe_load(f.read()).get("config", {})
+    config.update(overrides)
+
+    # Config values reach the program as strings, objects as JSON
+    return { key: value if isinstance(value, str) else json.dumps(value) for key, value in config.items() }
+
+def evaluate(project_dir: str, stack: str, azs: int, overrides: dict)->dict:
+    with open(path.join(project_dir, "Pulumi.yaml"), "r") as f:
+        project = yaml.safe_load(f.read())["name"]
+
+    os.chdir(project_dir)
+    sys.path.insert(0, project_dir)
+    block_network()
+    stub_calls(project_dir)
+
+    mocks = Mocks(azs=azs)
+    pulumi.runtime.set_mocks(mocks, project=project, stack=stack, preview=False)
+    pulumi.runtime.set_all_config(load_config(project_dir, stack, overrides))
+
+    @pulumi.runtime.test
+    def run_program():
+        runpy.run_path(path.join(project_dir, "__main__.py"), run_name="__main__")
+
+    evaluation_start = time.perf_counter()
+    run_program()
+    end = time.perf_counter()
+
+    return {
+        "project": project,
+        "azs": azs,
+        "total_seconds": round(end - start, 4),
+        "evaluation_seconds": round(end - evaluation_start, 4),
+        # Linux reports the peak RSS in KB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "resources": sum(mocks.resources.values()),
+        "resources_by_type": dict(sorted(mocks.resources.items())),
+        "invokes": dict(sorted(mocks.invokes.items())),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a Pulumi program under mocks")
+    parser.add_argument("--project-dir", required=True)
+    parser.add_argument("--stack", default="dev")
+    parser.add_argument("--azs", type=int, default=3)
+    parser.add_argument("--config", default="{}", help="Config overrides, as a JSON object")
+    args = parser.parse_args()
+
+    result = evaluate(path.abspath(args.project_dir), args.stack, args.azs, json.loads(args.config))
+    print(json.dumps(result))
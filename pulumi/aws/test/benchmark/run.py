@@ -0,0 +1,192 @@
+"""
+Program evaluation benchmark for the Pulumi projects, under mocks and without network
+
+  python run.py [--project eks-cluster] [--repeat 3] [--output results.json] [--baseline baseline.json]
+
+Each run evaluates a project in a fresh interpreter ( `program.py` ), using the project virtualenv when it exists,
+and records the evaluation time, the peak memory and the number of resources.
+Scenarios scale the inputs of a project ( availability zones, add-ons, manifests ) to report how the evaluation time grows.
+With `--baseline`, runs slower than the baseline by more than the tolerance are reported and the exit code is 1.
+"""
+from os import path
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+BENCHMARK_DIR = path.dirname(path.abspath(__file__))
+PROJECTS_DIR = path.dirname(path.dirname(BENCHMARK_DIR))
+
+# Add-ons enabled one by one by the `addons` scenario
+eks_addons = [
+    "helm:prometheus_stack",
+    "helm:thanos",
+    "helm:loki_stack",
+    "helm:opensearch",
+    "helm:argocd",
+    "helm:cilium",
+    "helm:aws_csi_driver",
+]
+
+def eks_workload_classes(count: int)->dict:
+    return {
+        f"workload-{i}": {
+            "labels": { "app": f"workload-{i}" },
+            "node_template": "bottlerocket",
+            "memory_ratio": [2, 4, 8][i % 3],
+            "arch": ["arm64", "amd64"],
+        } for i in range(count)
+    }
+
+# Scenarios: scale values and the config overrides / availability zones for each value
+projects = {
+    "eks-cluster": {
+        "dir": "eks-cluster",
+        "scenarios": {
+            "azs": {
+                "scales": [2, 3, 4, 6],
+                "run": lambda scale: { "azs": scale, "config": {} },
+            },
+            "addons": {
+                "scales": [0, 2, 4, len(eks_addons)],
+                "run": lambda scale: { "azs": 3, "config": { addon: True for addon in eks_addons[:scale] } },
+            },
+            "manifests": {
+                "scales": [1, 10, 50, 100],
+                "run": lambda scale: { "azs": 3, "config": { "karpenter:provisioners": eks_workload_classes(scale) } },
+            },
+        },
+    },
+    "s3-static-web": {
+        "dir": "cloudfront/s3-static-web",
+        "scenarios": {},
+    },
+    "ecr-repo-autoprovision": {
+        "dir": "lambda/ecr-repo-autoprovision",
+        "scenarios": {},
+    },
+    "ecr-registry-custom-domain": {
+        "dir": "lambda/ecr-registry-custom-domain",
+        "scenarios": {},
+    },
+}
+
+def project_python(project_dir: str, python: str = None)->str:
+    if python:
+        return python
+    venv_python = path.join(project_dir, "venv", "bin", "python")
+    return venv_python if path.exists(venv_python) else sys.executable
+
+def run_program(project_dir: str, stack: str, python: str = None, azs: int = 3, config: dict = {})->dict:
+    process = subprocess.run(
+        [
+            project_python(project_dir, python),
+            path.join(BENCHMARK_DIR, "program.py"),
+            "--project-dir", project_dir,
+            "--stack", stack,
+            "--azs", str(azs),
+            "--config", json.dumps(config),
+        ],
+        cwd=BENCHMARK_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        return { "error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"exit code {process.returncode}" }
+
+    # Programs may print, the measurements are the last line
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def measure(project_dir: str, stack: str, repeat: int, python: str = None, azs: int = 3, config: dict = {})->dict:
+    """
+    Median time of the repeated runs, resource counts don't change between runs
+    """
+    runs = [ run_program(project_dir, stack, python, azs, config) for _ in range(repeat) ]
+    errors = [ r["error"] for r in runs if "error" in r ]
+    if errors:
+        return { "error": errors[0] }
+
+    result = dict(runs[0])
+    for key in ["total_seconds", "evaluation_seconds", "peak_rss_mb"]:
+        result[key] = statistics.median(r[key] for r in runs)
+    return result
+
+def growth(points: list)->dict:
+    """
+    Evaluation time growth over the scenario: total ratio, and seconds per added resource
+    """
+    points = [ p for p in points if "error" not in p ]
+    if len(points) < 2:
+        return {}
+
+    first, last = points[0], points[-1]
+    added_resources = last["resources"] - first["resources"]
+    return {
+        "time_ratio": round(last["evaluation_seconds"] / first["evaluation_seconds"], 2) if first["evaluation_seconds"] else None,
+        "resource_ratio": round(last["resources"] / first["resources"], 2) if first["resources"] else None,
+        "seconds_per_added_resource": round((last["evaluation_seconds"] - first["evaluation_seconds"]) / added_resources, 5) if added_resources else None,
+    }
+
+def run(project_names: list, stack: str, repeat: int, python: str = None, scenarios: bool = True)->dict:
+    results = {}
+    for name in project_names:
+        project = projects[name]
+        project_dir = path.join(PROJECTS_DIR, project["dir"])
+        results[name] = { "baseline": measure(project_dir, stack, repeat, python), "scenarios": {} }
+
+        if not scenarios:
+            continue
+        for scenario_name, scenario in project["scenarios"].items():
+            points = []
+            for scale in scenario["scales"]:
+                point = measure(project_dir, stack, repeat, python, **scenario["run"](scale))
+                point["scale"] = scale
+                points.append(point)
+            results[name]["scenarios"][scenario_name] = { "points": points, "growth": growth(points) }
+
+    return results
+
+def regressions(results: dict, baseline: dict, tolerance: float)->list:
+    """
+    Baseline evaluations slower than the previous results by more than the tolerance, or with a different resource count
+    """
+    found = []
+    for name, result in results.items():
+        current, previous = result["baseline"], baseline.get(name, {}).get("baseline")
+        if not previous or "error" in previous:
+            continue
+        if "error" in current:
+            found.append(f"{name}: {current['error']}")
+            continue
+        if current["evaluation_seconds"] > previous["evaluation_seconds"] * (1 + tolerance):
+            found.append(f"{name}: evaluation {previous['evaluation_seconds']}s -> {current['evaluation_seconds']}s")
+        if current["resources"] != previous["resources"]:
+            found.append(f"{name}: resources {previous['resources']} -> {current['resources']}")
+    return found
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the evaluation of the Pulumi programs under mocks")
+    parser.add_argument("--project", action="append", choices=projects.keys(), help="Project to run, all by default")
+    parser.add_argument("--stack", default="dev", help="Stack config file ( Pulumi.<stack>.yaml ) of the projects")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--python", default=None, help="Interpreter for the programs, instead of the project virtualenvs")
+    parser.add_argument("--no-scenarios", action="store_true", help="Only run the baseline evaluation")
+    parser.add_argument("--output", default=None, help="Write the results to this file")
+    parser.add_argument("--baseline", default=None, help="Previous results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed evaluation time increase over the baseline")
+    args = parser.parse_args()
+
+    results = run(args.project or list(projects.keys()), args.stack, args.repeat, args.python, not args.no_scenarios)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"Regression: {regression}", file=sys.stderr)
+        sys.exit(1 if found else 0)
@@ -0,0 +1,102 @@
+"""
+Readiness gates of eks-cluster ( `readiness.py` ) against a fake Kubernetes API and clock
+
+  python -m pytest pulumi/aws/test/eks-cluster
+"""
+from os import path
+import sys
+
+import pytest
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))), "eks-cluster"))
+import readiness
+
+class FakeApi:
+    """
+    Successive states of each object, the last one is kept once the others were read ( `None` for a missing object )
+    """
+    def __init__(self, states: dict):
+        self.states = { key: list(values) for key, values in states.items() }
+        self.calls = []
+
+    def get(self, kind: str, namespace: str, name: str)->dict:
+        self.calls.append((kind, namespace, name))
+        values = self.states.get((kind, namespace, name), [None])
+        return values.pop(0) if len(values) > 1 else values[0]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+        self.sleeps = []
+
+    def monotonic(self)->float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def endpoints(addresses: list)->dict:
+    return { "subsets": [ { "addresses": [ { "ip": ip } for ip in addresses ] } ] }
+
+def crd(established: str)->dict:
+    return { "status": { "conditions": [ { "type": "NamesAccepted", "status": "True" }, { "type": "Established", "status": established } ] } }
+
+def deployment(replicas: int, updated: int, available: int, condition: str = "True")->dict:
+    return {
+        "spec": { "replicas": replicas },
+        "status": {
+            "updatedReplicas": updated,
+            "availableReplicas": available,
+            "conditions": [ { "type": "Available", "status": condition } ],
+        },
+    }
+
+def test_endpoints_ready_once_addresses_exist():
+    api = FakeApi({ ("Endpoints", "kube-system", "webhook"): [None, { "subsets": None }, endpoints([]), endpoints(["10.0.0.1"])] })
+    clock = FakeClock()
+
+    assert readiness.wait(api, "Endpoints", "kube-system", "webhook", timeout=60, interval=5, clock=clock)
+    assert len(api.calls) == 4
+    assert clock.sleeps == [5, 5, 5]
+
+def test_crd_established():
+    api = FakeApi({ ("CustomResourceDefinition", None, "provisioners.karpenter.sh"): [crd("False"), crd("True")] })
+    clock = FakeClock()
+
+    assert readiness.wait(api, "CustomResourceDefinition", None, "provisioners.karpenter.sh", timeout=60, interval=2, clock=clock)
+    assert clock.sleeps == [2]
+
+def test_deployment_available_waits_for_every_replica():
+    api = FakeApi({ ("Deployment", "keda", "keda-operator"): [
+        deployment(replicas=2, updated=2, available=1),
+        deployment(replicas=2, updated=1, available=2),
+        deployment(replicas=2, updated=2, available=2, condition="False"),
+        deployment(replicas=2, updated=2, available=2),
+    ] })
+    clock = FakeClock()
+
+    assert readiness.wait(api, "Deployment", "keda", "keda-operator", timeout=60, interval=1, clock=clock)
+    assert len(api.calls) == 4
+
+def test_deployment_without_replicas_defaults_to_one():
+    assert readiness.deployment_available({ "spec": {}, "status": deployment(1, 1, 1)["status"] })
+    assert not readiness.deployment_available({ "spec": {}, "status": {} })
+
+def test_timeout_raises_after_the_deadline():
+    api = FakeApi({})
+    clock = FakeClock()
+
+    with pytest.raises(TimeoutError, match="Endpoints kube-system/webhook not ready after 20s"):
+        readiness.wait(api, "Endpoints", "kube-system", "webhook", timeout=20, interval=5, clock=clock)
+    # Polled at 0, 5, 10, 15 and 20 seconds
+    assert len(api.calls) == 5
+    assert clock.now == 20
+
+def test_timeout_message_without_namespace():
+    with pytest.raises(TimeoutError, match="^CustomResourceDefinition scaledobjects.keda.sh not ready after 0s$"):
+        readiness.wait(FakeApi({}), "CustomResourceDefinition", None, "scaledobjects.keda.sh", timeout=0, clock=FakeClock())
+
+def test_unsupported_kind():
+    with pytest.raises(ValueError, match="Unsupported readiness kind 'Service'"):
+        readiness.wait(FakeApi({}), "Service", "default", "nginx", clock=FakeClock())